@@ -12,17 +12,29 @@ bl_info = {
 }
 
 import bpy
+import sys
 import math
+import importlib
 
-from . import (
-	java_package_synchronizer,
-	android_project_manager,
-	plane_sectionalizer
-)
+# the java package watcher runs from a scene update handler, its module being imported only
+# once it is enabled (or a file enabling it is loaded)
 
+def java_pack_watch(enable):
+	if enable or __package__ + ".java_package_synchronizer" in sys.modules:
+		importlib.import_module(".java_package_synchronizer", __package__).watch(enable)
+		
+def java_pack_watch_update(self, context):
+	java_pack_watch(self.java_pack_watch)
+	
+@bpy.app.handlers.persistent
+def java_pack_watch_load(dummy):
+	java_pack_watch(any(sc.bdx_tools.java_pack_watch for sc in bpy.data.scenes))
+	
+	
 class BdxToolsProps(bpy.types.PropertyGroup):
 	
 	java_pack_sync = bpy.props.BoolProperty(name="Sync java packages")
+	java_pack_watch = bpy.props.BoolProperty(name="Watch java packages", description="Check java texts in the background as they are added or edited, syncing them if Sync java packages is set", update=java_pack_watch_update)
 	
 	android_screen_orientation_items = [
 		("unspecified", "Unspecified", ""),
@@ -66,16 +78,108 @@ class BdxToolsProps(bpy.types.PropertyGroup):
 	plane_sect_gen_options = bpy.props.EnumProperty(items=[("save_json_file", "Save Json File", ""), ("generate_sections", "Generate Sections", ""), ("generate_sections_and_save_json_file", "Generate Sections and Save Json File", "")], name="", default="generate_sections_and_save_json_file")
 	plane_sect_approximate = bpy.props.BoolProperty(name="Approximate")
 	plane_sect_approx_ndigits = bpy.props.IntProperty(name="", min=0, max=15, default=4)
+	plane_sect_collision = bpy.props.BoolProperty(name="Collision Mesh", description="Export a simplified collision mesh, or heightfield, per section")
+	plane_sect_collision_tolerance = bpy.props.FloatProperty(name="", description="Collision mesh error tolerance", min=0.01, soft_max=16, default=0.5, subtype="DISTANCE")
+	plane_sect_merge_materials = bpy.props.BoolProperty(name="Merge Materials", description="Merge materials sharing a shader into one block per section, storing a layer index per vertex")
+	plane_sect_optimize_cache = bpy.props.BoolProperty(name="Optimize Vertex Cache", description="Reorder section triangles for the post-transform vertex cache, printing the average cache miss ratio before and after")
+	plane_sect_coarser_sizes = bpy.props.EnumProperty(items=[("2", "x2", ""), ("4", "x4", ""), ("8", "x8", ""), ("16", "x16", "")], name="Coarser Sizes", description="Also export the sections merged into cells of these multiples of the section size, each to its own file", options={"ENUM_FLAG"})
+	plane_sect_backend = bpy.props.EnumProperty(items=[("bpy", "Blender Operators", ""), ("numpy", "NumPy Workers", "")], name="Backend", default="bpy")
+	plane_sect_workers = bpy.props.IntProperty(name="Workers", description="Number of worker processes, 0 for one per CPU", min=0, soft_max=64, default=0)
+	plane_sect_scratch_scene = bpy.props.BoolProperty(name="Scratch Scene", description="Link temp data to a temporary scene, and only the final sections to this one (NumPy backend)")
+	plane_sect_preview = bpy.props.BoolProperty(name="Preview")
 	
-bpy.utils.register_class(BdxToolsProps)
-bpy.types.Scene.bdx_tools = bpy.props.PointerProperty(type=BdxToolsProps)
+# operators are registered as stubs: the module implementing an operator (and numpy, bmesh, ...)
+# is only imported when the operator is used for the first time; stubs keep the signatures
+# register_class checks
 
-modules = [java_package_synchronizer, android_project_manager, plane_sectionalizer]
+def lazy(name):
+	def method(self, context):
+		self.load()
+		return getattr(self, name)(context)
+	method.__name__ = name
+	return method
+	
+def lazy_event(name):
+	def method(self, context, event):
+		self.load()
+		return getattr(self, name)(context, event)
+	method.__name__ = name
+	return method
+	
+class LazyOperator:
+	
+	module = ""
+	
+	@classmethod
+	def load(cls):
+		if "module" in vars(cls):
+			impl = getattr(importlib.import_module("." + cls.module, __package__), cls.__name__)
+			for c in reversed(impl.__mro__[:-1]):
+				for name, value in vars(c).items():
+					if not name.startswith("__"):
+						setattr(cls, name, value)
+			del cls.module
+			
+	invoke = lazy_event("invoke")
+	draw = lazy("draw")
+	execute = lazy("execute")
+	
+class JavaPackageSynchronizer(LazyOperator, bpy.types.Operator):
+	
+	bl_description = "Sychronizes package names of java classes with BDX project"
+	bl_idname = "bdx.java_package_synchronizer"
+	bl_label = "BDX-Tools: Java Package Synchronizer"
+	bl_options = {"REGISTER", "UNDO"}
+	
+	module = "java_package_synchronizer"
+	
+class AndroidProjectManager(LazyOperator, bpy.types.Operator):
+	
+	bl_description = "Configures a BDX Android Project: enables/disables Vibrator, Accelerometer, Gyroscope, Compass and Rotation; specifies Screen Orientation and Resolution Strategy"
+	bl_idname = "bdx.android_project_manager"
+	bl_label = "BDX-Tools: Android Project Manager"
+	bl_options = {"REGISTER", "UNDO"}
+	
+	module = "android_project_manager"
+	
+class PlaneSectionalizer(LazyOperator, bpy.types.Operator):
+	
+	bl_description = "Sectionalizes a plane with options for your BDX project."
+	bl_idname = "bdx.plane_sectionalizer"
+	bl_label = "BDX-Tools: Plane Sectionalizer"
+	bl_options = {"REGISTER", "UNDO"}
+	
+	module = "plane_sectionalizer"
+	
+	check = lazy("check")
+	
+class PlaneSectionalizerModal(LazyOperator, bpy.types.Operator):
+	
+	bl_description = "Sectionalizes a plane in the background, showing progress; the view can be navigated meanwhile, press Esc to cancel."
+	bl_idname = "bdx.plane_sectionalizer_modal"
+	bl_label = "BDX-Tools: Plane Sectionalizer (Modal)"
+	bl_options = {"REGISTER", "UNDO"}
+	
+	module = "plane_sectionalizer"
+	
+	check = lazy("check")
+	modal = lazy_event("modal")
+	cancel = lazy("cancel")
+	
+classes = [JavaPackageSynchronizer, AndroidProjectManager, PlaneSectionalizer, PlaneSectionalizerModal]
 
 def register():
-	for m in modules:
-		m.register()
-
+	bpy.utils.register_class(BdxToolsProps)
+	bpy.types.Scene.bdx_tools = bpy.props.PointerProperty(type=BdxToolsProps)
+	for c in classes:
+		bpy.utils.register_class(c)
+	bpy.app.handlers.load_post.append(java_pack_watch_load)
+	
 def unregister():
-	for m in modules:
-		m.unregister()
+	bpy.app.handlers.load_post.remove(java_pack_watch_load)
+	java_pack_watch(False)
+	for c in reversed(classes):
+		bpy.utils.unregister_class(c)
+	del bpy.types.Scene.bdx_tools
+	bpy.utils.unregister_class(BdxToolsProps)
+	
\ No newline at end of file
@@ -0,0 +1,81 @@
+import os
+import zipfile
+import tempfile
+import numpy
+from collections import OrderedDict
+
+# Blender-free LRU cache of named numpy arrays, kept in memory and in .npz files, the least
+# recently used entries being evicted first from either
+
+DIRECTORY = os.path.join(tempfile.gettempdir(), "bdx_tools_cache")
+
+MEMORY_BYTES = 256 << 20
+DISK_BYTES = 2 << 30
+
+class ArrayCache:
+	
+	def __init__(self, directory=DIRECTORY, memory_bytes=MEMORY_BYTES, disk_bytes=DISK_BYTES):
+		self.directory = directory
+		self.memory_bytes = memory_bytes
+		self.disk_bytes = disk_bytes
+		self.entries = OrderedDict()
+		self.nbytes = 0
+		
+	def path(self, key):
+		return os.path.join(self.directory, key + ".npz")
+		
+	def get(self, key):
+		if key in self.entries:
+			self.entries.move_to_end(key)
+			return self.entries[key]
+		if not self.directory:
+			return None
+		try:
+			with numpy.load(self.path(key)) as f:
+				arrays = {name: f[name] for name in f.files}
+			os.utime(self.path(key))
+		except (OSError, ValueError, zipfile.BadZipFile):
+			return None
+		self.remember(key, arrays)
+		return arrays
+		
+	def put(self, key, arrays):
+		self.remember(key, arrays)
+		if not self.directory:
+			return
+		os.makedirs(self.directory, exist_ok=True)
+		fd, tmp_path = tempfile.mkstemp(suffix=".npz", dir=self.directory)
+		with os.fdopen(fd, "wb") as f:
+			numpy.savez(f, **arrays)
+		os.replace(tmp_path, self.path(key))
+		self.evict_disk()
+		
+	def remember(self, key, arrays):
+		for a in arrays.values():
+			a.flags.writeable = False
+		if key in self.entries:
+			self.nbytes -= sum(a.nbytes for a in self.entries.pop(key).values())
+		self.entries[key] = arrays
+		self.nbytes += sum(a.nbytes for a in arrays.values())
+		while self.nbytes > self.memory_bytes and len(self.entries) > 1:
+			key, arrays = self.entries.popitem(last=False)
+			self.nbytes -= sum(a.nbytes for a in arrays.values())
+			
+	def evict_disk(self):
+		files = []
+		for name in os.listdir(self.directory):
+			if name.endswith(".npz"):
+				file_path = os.path.join(self.directory, name)
+				stat = os.stat(file_path)
+				files.append((stat.st_mtime, stat.st_size, file_path))
+		total = sum(size for mtime, size, file_path in files)
+		for mtime, size, file_path in sorted(files)[:-1]:
+			if total <= self.disk_bytes:
+				break
+			os.remove(file_path)
+			total -= size
+			
+	def clear(self):
+		self.entries.clear()
+		self.nbytes = 0
+		
\ No newline at end of file
@@ -1,16 +1,13 @@
 import bpy
+import os
+import time
 from . import utils as ut
 
 error_bdx_not_installed = "BDX add-on not installed!"
 error_bdx_project_missing = "BDX project missing!"
 error_bdx_java_pack = "Java packages are not in sync with BDX project!"
 
-class JavaPackageSynchronizer(bpy.types.Operator):
-	
-	bl_description = "Sychronizes package names of java classes with BDX project"
-	bl_idname = "bdx.java_package_synchronizer"
-	bl_label = "BDX-Tools: Java Package Synchronizer"
-	bl_options = {"REGISTER", "UNDO"}
+class JavaPackageSynchronizer:
 	
 	error = ""
 	
@@ -35,27 +32,108 @@ class JavaPackageSynchronizer(bpy.types.Operator):
 			row().label(self.error, icon="ERROR")
 			return
 			
-		if ut.java_pack_error():
+		if watcher.errors if context.scene.bdx_tools.java_pack_watch else ut.java_pack_error():
 			row().label(error_bdx_java_pack, icon="ERROR")
 			row().prop(context.scene.bdx_tools, "java_pack_sync")
 		else:
 			row().label("Java packages synced with BDX project: " + ut.java_pack_name())
-			
+		row().prop(context.scene.bdx_tools, "java_pack_watch")
+		
 	def execute(self, context):
 		if self.error:
 			return {"CANCELLED"}
 			
 		if context.scene.bdx_tools.java_pack_sync:
 			ut.java_pack_sync();
+			watcher.checked.clear()
+			watcher.count = -1
 			
 		return {"PASS_THROUGH"}
 		
-def register():
-	bpy.utils.register_class(JavaPackageSynchronizer)
+# watching
+
+CHECK_INTERVAL = 0.5
+
+class JavaPackageWatcher:
 	
-def unregister():
-	bpy.utils.unregister_class(JavaPackageSynchronizer)
+	# Checks java texts in the background, from a scene update handler: texts flagged
+	# is_updated (edited, changed by a script or reloaded) are noted on every update, since
+	# the flags are cleared after it, and at most every CHECK_INTERVAL seconds the noted texts,
+	# new ones and those whose first line changed are validated, and fixed if java_pack_sync is
+	# set, against a package name read again only when BdxApp.java changes on disk.
 	
-if __name__ == "__main__":
-	register()
-	
\ No newline at end of file
+	def __init__(self):
+		self.file_path = None
+		self.mtime = None
+		self.package = None
+		self.checked = {}
+		self.pending = set()
+		self.errors = set()
+		self.count = -1
+		self.next_check = 0
+		
+	def text_package(self):
+		try:
+			mtime = os.stat(self.file_path).st_mtime
+		except (TypeError, OSError):
+			root = ut.src_root()
+			if not root:
+				return None
+			self.file_path = ut.j(root, "BdxApp.java")
+			mtime = os.stat(self.file_path).st_mtime
+		if mtime != self.mtime:
+			self.mtime = mtime
+			self.package = ut.java_text_package()
+			self.checked.clear()
+			self.errors.clear()
+			self.count = -1
+		return self.package
+		
+	def changed_texts(self):
+		texts = bpy.data.texts
+		if texts.is_updated or len(texts) != self.count:
+			self.count = len(texts)
+			for name in list(self.checked):
+				if name not in texts:
+					del self.checked[name]
+					self.errors.discard(name)
+		return [t for t in ut.java_texts() if t.name in self.pending or self.checked.get(t.name) != t.lines[0].body]
+		
+	def check(self, scene):
+		self.pending.update(t.name for t in ut.java_texts() if t.is_updated)
+		now = time.time()
+		if now < self.next_check:
+			return
+		self.next_check = now + CHECK_INTERVAL
+		package = self.text_package()
+		if package is None:
+			return
+		texts = self.changed_texts()
+		if scene.bdx_tools.java_pack_sync:
+			texts += [bpy.data.texts[name] for name in self.errors if name in bpy.data.texts]
+		for t in texts:
+			if scene.bdx_tools.java_pack_sync:
+				ut.java_text_sync(t, package)
+			self.checked[t.name] = t.lines[0].body
+			if ut.java_text_error(t, package):
+				self.errors.add(t.name)
+			else:
+				self.errors.discard(t.name)
+		self.pending.clear()
+		
+watcher = JavaPackageWatcher()
+
+@bpy.app.handlers.persistent
+def java_pack_watch_handler(scene):
+	if scene.bdx_tools.java_pack_watch and hasattr(scene, "bdx"):
+		watcher.check(scene)
+		
+def watch(enable):
+	handlers = bpy.app.handlers.scene_update_post
+	if java_pack_watch_handler in handlers:
+		handlers.remove(java_pack_watch_handler)
+	global watcher
+	watcher = JavaPackageWatcher()
+	if enable:
+		handlers.append(java_pack_watch_handler)
+		
\ No newline at end of file
@@ -1,12 +1,16 @@
 import bpy
 import bmesh
-import math
 import os
-import json
+import time
 import numpy
+import hashlib
+import traceback
 from mathutils import Vector
 from collections import OrderedDict
 from . import utils as ut
+from . import sections as se
+from . import sctx
+from . import cache
 
 ERROR_SELECTED_NO_MESH_DATA = "Selected object(s) not containing mesh data"
 ERROR_SELECTED_INACTIVE_LAYER = "Selected object(s) not in active layer"
@@ -22,12 +26,476 @@ TEMP_SUFFIX = "__TEMP"
 PART_SUFFIX = "__PART"
 SECT_SUFFIX = "_SECT"
 
-class PlaneSectionalizer(bpy.types.Operator):
+DEFAULT_MATERIAL = sctx.DEFAULT_MATERIAL
+
+PHASES = ["Creating temp data", "Welding", "Separating loose parts", "Multisecting", "Separating sections", "Transferring normals", "Finalizing sections", "Calculating custom normals", "Extracting BDX data", "Exporting json file"]
+
+WELD_TOLERANCE = 0.0001
+
+RNA_IGNORED = {"rna_type", "users", "tag", "is_updated", "is_updated_data", "use_fake_user", "show_expanded", "show_in_editmode", "show_on_cage"}
+
+CACHE = cache.ArrayCache()
+
+CACHE_FORMAT = 2
+
+TICK_INTERVAL = 0.05
+TICK_BUDGET = 0.1
+
+NAVIGATION_EVENTS = {"MOUSEMOVE", "INBETWEEN_MOUSEMOVE", "MIDDLEMOUSE", "WHEELUPMOUSE", "WHEELDOWNMOUSE", "TRACKPADPAN", "TRACKPADZOOM", "MOUSEROTATE", "NDOF_MOTION", "NUMPAD_0", "NUMPAD_1", "NUMPAD_2", "NUMPAD_3", "NUMPAD_4", "NUMPAD_5", "NUMPAD_6", "NUMPAD_7", "NUMPAD_8", "NUMPAD_9", "NUMPAD_PERIOD", "NUMPAD_PLUS", "NUMPAD_MINUS", "HOME"}
+
+def read_mesh(me):
+	co = numpy.empty(len(me.vertices) * 3, numpy.float32)
+	me.vertices.foreach_get("co", co)
+	loop_vertices = numpy.empty(len(me.loops), numpy.int32)
+	me.loops.foreach_get("vertex_index", loop_vertices)
+	loop_start = numpy.empty(len(me.polygons), numpy.int32)
+	me.polygons.foreach_get("loop_start", loop_start)
+	loop_total = numpy.empty(len(me.polygons), numpy.int32)
+	me.polygons.foreach_get("loop_total", loop_total)
+	poly_mat = numpy.empty(len(me.polygons), numpy.int32)
+	me.polygons.foreach_get("material_index", poly_mat)
+	poly_smooth = [False] * len(me.polygons)
+	me.polygons.foreach_get("use_smooth", poly_smooth)
+	loop_uvs = None
+	if me.uv_layers.active:
+		loop_uvs = numpy.empty(len(me.loops) * 2, numpy.float32)
+		me.uv_layers.active.data.foreach_get("uv", loop_uvs)
+		loop_uvs = loop_uvs.reshape(-1, 2)
+	return co.reshape(-1, 3), loop_start, loop_total, loop_vertices, poly_mat, numpy.array(poly_smooth, bool), loop_uvs
+	
+def read_normals(me):
+	me.calc_normals_split()
+	normals = numpy.empty(len(me.loops) * 3, numpy.float32)
+	me.loops.foreach_get("normal", normals)
+	return normals.reshape(-1, 3)
+	
+def read_sharp_edges(me):
+	vertices = numpy.empty(len(me.edges) * 2, numpy.int32)
+	me.edges.foreach_get("vertices", vertices)
+	sharp = [False] * len(me.edges)
+	me.edges.foreach_get("use_edge_sharp", sharp)
+	return vertices.reshape(-1, 2)[numpy.array(sharp, bool)]
+	
+def smoothing(me):
+	
+	# Sharp edges, auto smooth angle (None without auto smooth) and, for custom normals, the
+	# split normals of a mesh, which a mesh rebuilt from its arrays needs to shade the same.
+	
+	return read_sharp_edges(me), me.auto_smooth_angle if me.use_auto_smooth else None, read_normals(me) if me.has_custom_normals else None
+	
+def id_key(value, depth):
+	if value is None:
+		return None
+	if isinstance(value, bpy.types.Image):
+		file_path = bpy.path.abspath(value.filepath)
+		return (value.name, value.filepath, os.path.getmtime(file_path) if os.path.isfile(file_path) else None, value.is_dirty)
+	if isinstance(value, bpy.types.Object):
+		return (value.name, tuple(map(tuple, value.matrix_world)), value.data.name if value.data else None)
+	if isinstance(value, bpy.types.ID):
+		return (value.name, rna_key(value, depth - 1)) if depth else value.name
+	return rna_key(value, depth - 1) if depth else None
+	
+def rna_key(struct, depth=1):
+	
+	# The settings of a modifier, or any RNA struct: its properties, with referenced datablocks
+	# identified by name and, up to depth, by their own settings (textures, ...), images by
+	# file and modification time, objects by transform.
+	
+	key = []
+	for prop in struct.bl_rna.properties:
+		if prop.identifier in RNA_IGNORED or prop.type == "COLLECTION":
+			continue
+		value = getattr(struct, prop.identifier, None)
+		if prop.type == "POINTER":
+			value = id_key(value, depth)
+		elif hasattr(value, "__len__") and not isinstance(value, str):
+			value = tuple(value)
+		key.append((prop.identifier, value))
+	return tuple(key)
+	
+def evaluated_key(ob, apply_modifiers, modifier_settings):
+	
+	# Hash of what the evaluated mesh of ob depends on: its mesh data with shape keys and
+	# smoothing (the cached split normals depend on it), its materials and, applying
+	# modifiers, their settings, the weights of the vertex groups they use and the object's
+	# placement (texture coordinates, Boolean or Mirror objects, ...). CACHE_FORMAT changes
+	# with the cached arrays.
+	
+	me = ob.data
+	h = hashlib.sha1(str(CACHE_FORMAT).encode())
+	for a in read_mesh(me):
+		if a is not None:
+			h.update(a.tobytes())
+	h.update(repr([slot.material.name if slot.material else None for slot in ob.material_slots]).encode())
+	sharp_edges, auto_smooth_angle, loop_normals = smoothing(me)
+	h.update(repr(auto_smooth_angle).encode())
+	h.update(sharp_edges.tobytes())
+	if loop_normals is not None:
+		h.update(loop_normals.tobytes())
+	if me.shape_keys:
+		h.update(repr((ob.show_only_shape_key, ob.active_shape_key_index, rna_key(me.shape_keys))).encode())
+		for block in me.shape_keys.key_blocks:
+			co = numpy.empty(len(block.data) * 3, numpy.float32)
+			block.data.foreach_get("co", co)
+			h.update(repr(rna_key(block)).encode())
+			h.update(co.tobytes())
+	if apply_modifiers and len(ob.modifiers):
+		h.update(modifier_settings.encode())
+		for modifier in ob.modifiers:
+			h.update(repr(rna_key(modifier)).encode())
+		h.update(numpy.array(ob.matrix_world, numpy.float64).tobytes())
+		h.update(repr([(group.name, group.index) for group in ob.vertex_groups]).encode())
+		groups = used_vertex_groups(ob)
+		if groups:
+			h.update(repr([[(g.group, g.weight) for g in v.groups if g.group in groups] for v in me.vertices]).encode())
+	return h.hexdigest()
+	
+def used_vertex_groups(ob):
+	
+	# Indices of the vertex groups the modifiers of ob name (all of them for armatures
+	# deforming by vertex groups), the only weights worth reading vertex by vertex.
+	
+	names = set()
+	for modifier in ob.modifiers:
+		if modifier.type == "ARMATURE" and modifier.use_vertex_groups:
+			return {group.index for group in ob.vertex_groups}
+		for prop in modifier.bl_rna.properties:
+			if prop.type == "STRING" and prop.identifier.startswith("vertex_group"):
+				names.add(getattr(modifier, prop.identifier))
+	return {group.index for group in ob.vertex_groups if group.name in names}
+	
+def mesh_arrays(sc, ob, apply_modifiers=False, modifier_settings="RENDER"):
+	
+	# The evaluated mesh arrays are cached, keyed on the mesh data, the modifier settings and
+	# what they reference, so a new grid layout does not evaluate the modifiers again; returned
+	# by name, positions and split normals in world space.
+	
+	key = evaluated_key(ob, apply_modifiers, modifier_settings)
+	arrays = CACHE.get(key)
+	if arrays is None:
+		me = ob.to_mesh(sc, apply_modifiers, modifier_settings)
+		names = ("co", "loop_start", "loop_total", "loop_vertices", "poly_mat", "poly_smooth", "loop_uvs")
+		arrays = {name: a for name, a in zip(names, read_mesh(me)) if a is not None}
+		arrays["materials"] = numpy.array([m.name if m else DEFAULT_MATERIAL for m in me.materials] or [DEFAULT_MATERIAL])
+		arrays["loop_normals"] = read_normals(me)
+		arrays["sharp_edges"] = read_sharp_edges(me)
+		arrays["auto_smooth"] = numpy.array([me.auto_smooth_angle if me.use_auto_smooth else -1.0])
+		arrays["custom_normals"] = numpy.array(me.has_custom_normals)
+		bpy.data.meshes.remove(me, do_unlink=True)
+		CACHE.put(key, arrays)
+	arrays = dict(arrays)
+	matrix = numpy.array(ob.matrix_world, numpy.float64)
+	arrays["co"] = (numpy.dot(arrays["co"], matrix[:3, :3].T) + matrix[:3, 3]).astype(numpy.float32)
+	normals = numpy.dot(arrays["loop_normals"], numpy.linalg.inv(matrix[:3, :3]))
+	arrays["loop_normals"] = (normals / numpy.maximum(numpy.linalg.norm(normals, axis=1), 1e-12)[:, None]).astype(numpy.float32)
+	arrays["materials"] = arrays["materials"].tolist()
+	return arrays
+	
+def evaluated_copy(sc, ob, suffix="", apply_modifiers=False, modifier_settings="RENDER"):
+	
+	# Like ut.copy, from the cached evaluated arrays (in world space, triangulated).
+	
+	a = mesh_arrays(sc, ob, apply_modifiers, modifier_settings)
+	tri_loops, tri_poly = se.triangulate(a["loop_start"], a["loop_total"])
+	tri_uvs = a["loop_uvs"][tri_loops] if "loop_uvs" in a else None
+	tri_normals = a["loop_normals"][tri_loops] if a["custom_normals"] else None
+	auto_smooth = float(a["auto_smooth"][0])
+	me = mesh_from_arrays(ob.data.name + suffix, a["co"], a["loop_vertices"][tri_loops], a["poly_mat"][tri_poly], a["poly_smooth"][tri_poly], tri_uvs, [bpy.data.materials.get(m) for m in a["materials"]], tri_normals, a["sharp_edges"], auto_smooth if auto_smooth >= 0 else None)
+	ob_copy = bpy.data.objects.new(ob.name + suffix, me)
+	sc.objects.link(ob_copy)
+	return ob_copy
+	
+def source_arrays(sc, objects, apply_modifiers=False, modifier_settings="RENDER"):
+	
+	# Triangulated world space arrays of all objects, with one material list for all of them;
+	# uvs are those of the active layer, or zero, normals the split normals of the corners.
+	
+	cos, tris, tri_mats, tri_smooths, tri_uvs, tri_normals, materials = [], [], [], [], [], [], []
+	n = 0
+	for ob in objects:
+		a = mesh_arrays(sc, ob, apply_modifiers, modifier_settings)
+		co, loop_vertices, poly_mat, poly_smooth, loop_uvs = a["co"], a["loop_vertices"], a["poly_mat"], a["poly_smooth"], a.get("loop_uvs")
+		tri_loops, tri_poly = se.triangulate(a["loop_start"], a["loop_total"])
+		indices = []
+		for m in a["materials"]:
+			if m not in materials:
+				materials.append(m)
+			indices.append(materials.index(m))
+		tri_mats.append(numpy.array(indices)[numpy.minimum(poly_mat[tri_poly], len(indices) - 1)])
+		tri_smooths.append(poly_smooth[tri_poly])
+		tri_uvs.append(loop_uvs[tri_loops] if loop_uvs is not None else numpy.zeros(tri_loops.shape + (2,), numpy.float32))
+		tri_normals.append(a["loop_normals"][tri_loops])
+		tris.append(loop_vertices[tri_loops] + n)
+		cos.append(co)
+		n += len(co)
+	return numpy.concatenate(cos), numpy.concatenate(tris), numpy.concatenate(tri_mats), numpy.concatenate(tri_smooths), numpy.concatenate(tri_uvs), numpy.concatenate(tri_normals), materials
+	
+def mesh_from_arrays(name, co, tris, tri_mat, tri_smooth, tri_uvs, materials, tri_normals=None, sharp_edges=None, auto_smooth_angle=None):
+	
+	# A mesh of triangles; its edges between vertices of sharp_edges are marked sharp, and
+	# given split normals per corner, these become custom split normals.
+	
+	me = bpy.data.meshes.new(name)
+	me.vertices.add(len(co))
+	me.vertices.foreach_set("co", co.astype(numpy.float32).ravel())
+	me.loops.add(len(tris) * 3)
+	me.loops.foreach_set("vertex_index", tris.astype(numpy.int32).ravel())
+	me.polygons.add(len(tris))
+	me.polygons.foreach_set("loop_start", numpy.arange(0, len(tris) * 3, 3, dtype=numpy.int32))
+	me.polygons.foreach_set("loop_total", numpy.full(len(tris), 3, numpy.int32))
+	me.polygons.foreach_set("material_index", tri_mat.astype(numpy.int32))
+	me.polygons.foreach_set("use_smooth", tri_smooth.tolist())
+	if tri_uvs is not None:
+		me.uv_textures.new()
+		me.uv_layers[0].data.foreach_set("uv", tri_uvs.astype(numpy.float32).ravel())
+	me.update(calc_edges=True)
+	for m in materials:
+		me.materials.append(m)
+	if sharp_edges is not None and len(sharp_edges):
+		edges = numpy.empty(len(me.edges) * 2, numpy.int32)
+		me.edges.foreach_get("vertices", edges)
+		edges = numpy.sort(edges.reshape(-1, 2), axis=1).astype(numpy.int64)
+		sharp_edges = numpy.sort(sharp_edges, axis=1).astype(numpy.int64)
+		sharp = numpy.in1d(edges[:, 0] * len(co) + edges[:, 1], sharp_edges[:, 0] * len(co) + sharp_edges[:, 1])
+		me.edges.foreach_set("use_edge_sharp", sharp.tolist())
+	if auto_smooth_angle is not None:
+		me.use_auto_smooth = True
+		me.auto_smooth_angle = auto_smooth_angle
+	if tri_normals is not None:
+		me.use_auto_smooth = True
+		me.normals_split_custom_set(tri_normals.reshape(-1, 3).tolist())
+	return me
+	
+def weld(ob, tolerance=WELD_TOLERANCE):
+	
+	# Replaces the mesh of ob by a triangulated copy with its coincident vertices merged,
+	# without entering edit mode (remove_doubles + quads_convert_to_tris); sharp edges, auto
+	# smooth and custom split normals are kept.
+	
+	me = ob.data
+	co, loop_start, loop_total, loop_vertices, poly_mat, poly_smooth, loop_uvs = read_mesh(me)
+	sharp_edges, auto_smooth_angle, loop_normals = smoothing(me)
+	tri_loops, tri_poly = se.triangulate(loop_start, loop_total)
+	n = len(co)
+	co, tris, keep = se.weld(co, loop_vertices[tri_loops], tolerance)
+	tri_loops, tri_poly = tri_loops[keep], tri_poly[keep]
+	
+	welded = numpy.full(n, -1, numpy.int64)
+	welded[loop_vertices[tri_loops]] = tris
+	sharp_edges = welded[sharp_edges]
+	sharp_edges = sharp_edges[(sharp_edges >= 0).all(axis=1)]
+	
+	name = me.name
+	tri_uvs = loop_uvs[tri_loops] if loop_uvs is not None else None
+	tri_normals = loop_normals[tri_loops] if loop_normals is not None else None
+	ob.data = mesh_from_arrays(name, co, tris, poly_mat[tri_poly], poly_smooth[tri_poly], tri_uvs, me.materials, tri_normals, sharp_edges, auto_smooth_angle)
+	if not me.users:
+		bpy.data.meshes.remove(me, do_unlink=True)
+		ob.data.name = name
+		
+def extract(me):
+	
+	# BDX vertices (position, split normal, flipped uv) of the triangles of a mesh, per
+	# material; faces of empty slots are left out unless the mesh has no materials at all.
+	
+	co, loop_start, loop_total, loop_vertices, poly_mat, poly_smooth, loop_uvs = read_mesh(me)
+	normals = numpy.empty(len(me.loops) * 3, numpy.float32)
+	me.loops.foreach_get("normal", normals)
+	if loop_uvs is None:
+		loop_uvs = numpy.zeros((len(me.loops), 2), numpy.float32)
+	loops = numpy.column_stack((co[loop_vertices], normals.reshape(-1, 3), loop_uvs[:, 0], 1 - loop_uvs[:, 1]))
+	tri_loops, tri_poly = se.triangulate(loop_start, loop_total)
+	
+	slots = [m.name if m else DEFAULT_MATERIAL for m in me.materials] or [DEFAULT_MATERIAL]
+	tri_mat = numpy.minimum(poly_mat[tri_poly], len(slots) - 1)
+	m_verts = OrderedDict()
+	for mat in [m.name for m in me.materials if m] or [DEFAULT_MATERIAL]:
+		tris = numpy.in1d(tri_mat, [i for i, m in enumerate(slots) if m == mat])
+		if tris.any():
+			m_verts[mat] = loops[tri_loops[tris]].reshape(-1, 8)
+	return m_verts
+	
+def coarse_sections(name, sections, offset, size, factor):
+	
+	# Sections merged into cells factor times the size, the blocks of a material of the child
+	# sections being concatenated in the space of their coarse cell.
+	
+	if not sections:
+		return []
+	cells = se.cell_indices([position for sect_name, position, m_verts in sections], offset, size)
+	parents, inverse, shift = se.coarsen(cells, factor, size)
+	merged = [OrderedDict() for parent in parents]
+	for (sect_name, position, m_verts), k, (dx, dy) in zip(sections, inverse.tolist(), shift.tolist()):
+		for m, verts in m_verts.items():
+			verts = verts.copy()
+			verts[:, 0] += dx
+			verts[:, 1] += dy
+			merged[k].setdefault(m, []).append(verts)
+	origin = sctx.coarse_offset(offset, size, factor)
+	id_length = max(len(str(len(parents))), 3)
+	coarse = []
+	for i, ((x, y), m_verts) in enumerate(zip(parents.tolist(), merged)):
+		position = (origin[0] + x * size[0] * factor, origin[1] + y * size[1] * factor, 0.0)
+		coarse.append((name + SECT_SUFFIX + ut.id(i, ".", id_length), position, OrderedDict((m, numpy.concatenate(l)) for m, l in m_verts.items())))
+	return coarse
+	
+def section_object(sc, name, position, m_verts):
+	
+	# Links a new object for a section given by its BDX vertices, their normals becoming
+	# custom split normals.
+	
+	verts = numpy.concatenate(list(m_verts.values()))
+	tri_mat = numpy.repeat(numpy.arange(len(m_verts)), [len(v) // 3 for v in m_verts.values()])
+	co, tris, keep = se.weld(verts[:, :3], numpy.arange(len(verts)).reshape(-1, 3), WELD_TOLERANCE)
+	corners = verts.reshape(-1, 3, 8)[keep]
+	uvs = corners[..., 6:8].copy()
+	uvs[..., 1] = 1 - uvs[..., 1]
+	me = mesh_from_arrays(name, co, tris, tri_mat[keep], numpy.ones(len(tris), bool), uvs, [bpy.data.materials.get(m) for m in m_verts], corners[..., 3:6])
+	ob = bpy.data.objects.new(name, me)
+	ob.location = position
+	sc.objects.link(ob)
+	return ob
+	
+def decimate(sc, ob, angle_limit, ratio):
+	
+	# Replaces the mesh of ob by a decimated copy without entering edit mode: beautified, then
+	# evaluated with Decimate modifiers doing the limited dissolve and collapse of the mesh
+	# operators.
+	
+	me = ob.data
+	bm = bmesh.new()
+	bm.from_mesh(me)
+	bmesh.ops.beautify_fill(bm, faces=bm.faces[:], edges=bm.edges[:])
+	bm.to_mesh(me)
+	bm.free()
+	
+	if angle_limit:
+		modifier = ob.modifiers.new(name="Dissolve", type="DECIMATE")
+		modifier.decimate_type = "DISSOLVE"
+		modifier.angle_limit = angle_limit
+		modifier.delimit = {"NORMAL", "MATERIAL", "SEAM", "SHARP", "UV"}
+	if ratio < 1:
+		modifier = ob.modifiers.new(name="Collapse", type="DECIMATE")
+		modifier.ratio = ratio
+		
+	name = me.name
+	ob.data = ob.to_mesh(sc, True, "PREVIEW")
+	ob.modifiers.clear()
+	if not me.users:
+		bpy.data.meshes.remove(me, do_unlink=True)
+		ob.data.name = name
+		
+def scratch_scene(scene, objects):
+	
+	# A scene with the layers and frame of scene and objects linked to it, for temp data to be
+	# linked to, and joined by operators, without updating scene.
+	
+	scratch = bpy.data.scenes.new(scene.name + TEMP_SUFFIX)
+	scratch.layers = scene.layers
+	scratch.frame_current = scene.frame_current
+	for ob in objects:
+		scratch.objects.link(ob)
+	return scratch
+	
+def scene_override(context, sc, active, selected):
+	
+	# A context for object operators to run on objects of sc, which need not be the scene the
+	# screen shows, as if active was active and selected the selection.
+	
+	override = context.copy()
+	bases = [base for base in sc.object_bases if base.object in selected]
+	override.update(scene=sc, active_object=active, object=active, selected_objects=selected, selected_editable_objects=selected, selected_bases=bases, selected_editable_bases=bases)
+	return override
+	
+def created(collection, before, known):
+	
+	# Pointers of the data in collection that is not in before or is known; data removed since
+	# is dropped, so that its pointers, if reused, do not match other data.
+	
+	now = {d.as_pointer() for d in collection}
+	return (now - before) | (known & now)
+	
+def remove_temp_data(tmps, tmps_particles):
+	for ob in tmps:
+		me = ob.data
+		bpy.data.objects.remove(ob, do_unlink=True)
+		bpy.data.meshes.remove(me, do_unlink=True)
+		
+	for ob in tmps_particles:
+		bpy.data.objects.remove(ob, do_unlink=True)
+		
+def phase(name, steps):
+	
+	# Yields the (done, total) steps of a kernel generator as steps of phase name, returning
+	# its result; the kernel is closed if the caller is.
+	
+	try:
+		while True:
+			try:
+				done, total = next(steps)
+			except StopIteration as e:
+				return e.value
+			yield name, done, total
+	finally:
+		steps.close()
+		
+def shader_key(name):
 	
-	bl_description = "Sectionalizes a plane with options for your BDX project."
-	bl_idname = "bdx.plane_sectionalizer"
-	bl_label = "BDX-Tools: Plane Sectionalizer"
-	bl_options = {"REGISTER", "UNDO"}
+	# Materials with equal keys render with the same shader and differ only by colors and
+	# textures, which a layer index per vertex can select at runtime.
+	
+	mat = bpy.data.materials.get(name)
+	if mat is None:
+		return (name,)
+	game = mat.game_settings
+	textures = tuple(bool(slot and slot.texture) for slot in mat.texture_slots)
+	return (mat.type, mat.diffuse_shader, mat.specular_shader, mat.use_shadeless, mat.use_transparency, mat.transparency_method, mat.use_vertex_color_paint, game.alpha_blend, game.use_backface_culling, textures)
+	
+def merged_materials(materials):
+	names = OrderedDict()
+	for m in materials:
+		names.setdefault(shader_key(m), m)
+	merged = list(names.values())
+	return numpy.array([merged.index(names[shader_key(m)]) for m in materials], numpy.int64), merged
+	
+def activate(context, ob):
+	if context.mode != "OBJECT":
+		bpy.ops.object.mode_set(mode="OBJECT")
+	for o in context.selected_objects:
+		o.select = False
+	ob.select = True
+	context.scene.objects.active = ob
+	
+class Progress:
+	
+	# Steps of the pipeline and their throughput per phase; the value counts the phases run
+	# so far, the export phases being run again for each coarser size.
+	
+	def __init__(self):
+		self.phases = OrderedDict()
+		self.phase = None
+		self.count = 0
+		self.value = 0
+		
+	def step(self, steps):
+		t = time.time()
+		phase, done, total = next(steps)
+		stats = self.phases.setdefault(phase, [0, 0.0])
+		stats[0] = done
+		stats[1] += time.time() - t
+		if phase != self.phase:
+			self.count += self.phase is not None
+			self.phase = phase
+		self.value = self.count + done / total
+		
+	def throughput(self):
+		l = []
+		for phase, (n, s) in self.phases.items():
+			l.append(phase + ": " + str(n) + " in " + str(round(s, 2)) + " s (" + str(round(n / s if s else 0, 1)) + " per s)")
+		return l
+		
+		
+class PlaneSectionalizer:
 	
 	error = ""
 	
@@ -36,6 +504,11 @@ class PlaneSectionalizer(bpy.types.Operator):
 	sect_size = Vector().to_2d()
 	originals = []
 	
+	preview = None
+	preview_key = None
+	preview_arrays = None
+	preview_arrays_key = None
+	
 	def invoke(self, context, event):
 		objects = []
 		for ob in context.selected_editable_objects:
@@ -118,99 +591,125 @@ class PlaneSectionalizer(bpy.types.Operator):
 		
 		col = row().column
 		col_appr = col()
+		col_appr.prop(context.scene.bdx_tools, "plane_sect_merge_materials")
+		col_appr.prop(context.scene.bdx_tools, "plane_sect_optimize_cache")
 		col_appr.prop(context.scene.bdx_tools, "plane_sect_approximate")
 		col_ndig = col()
 		col_ndig.prop(context.scene.bdx_tools, "plane_sect_approx_ndigits")
 		
+		col = row().column
+		col_coll = col()
+		col_coll.prop(context.scene.bdx_tools, "plane_sect_collision")
+		col_tole = col()
+		col_tole.prop(context.scene.bdx_tools, "plane_sect_collision_tolerance")
+		
+		row_coar = row()
+		row_coar.prop(context.scene.bdx_tools, "plane_sect_coarser_sizes")
+		
 		if context.scene.bdx_tools.plane_sect_gen_options == "generate_sections":
 			col_appr.active = False
 			col_ndig.active = False
+			col_coll.active = False
+			col_tole.active = False
+			row_coar.active = False
 		else:
 			if not context.scene.bdx_tools.plane_sect_approximate:
 				col_ndig.active = False
+			if not context.scene.bdx_tools.plane_sect_collision:
+				col_tole.active = False
 			if not hasattr(context.scene, "bdx"):
 				row().label(WARN_BDX_NOT_INSTALLED + " " + WARN_BDX_SAVE_DIR, icon="ERROR")
 			elif not ut.src_root():
 				row().label(WARN_BDX_PROJECT_MISSING + " " + WARN_BDX_SAVE_DIR, icon="ERROR")
 				
+		col = row().column
+		col().prop(context.scene.bdx_tools, "plane_sect_backend")
+		col_work = col()
+		col_work.prop(context.scene.bdx_tools, "plane_sect_workers")
+		if context.scene.bdx_tools.plane_sect_backend != "numpy":
+			col_work.active = False
+		col_scra = col()
+		col_scra.prop(context.scene.bdx_tools, "plane_sect_scratch_scene")
+		if context.scene.bdx_tools.plane_sect_backend != "numpy":
+			col_scra.active = False
+			
+		row().prop(context.scene.bdx_tools, "plane_sect_preview")
+		
+		if context.scene.bdx_tools.plane_sect_preview:
+			est = self.estimate(context)
+			col = row().column(align=True)
+			col.label("Predicted sections: " + str(est.sections) + ", empty cells: " + str(est.empty))
+			for (i, j), mat, n in est.worst():
+				col.label("Cell " + str(i) + ", " + str(j) + " - \"" + mat + "\": ~" + str(n) + " vertices", icon="ERROR" if n > se.VERTICES_MAX else "NONE")
+				
 	def check(self, context):
 		return True
 		
-	def execute(self, context):
+	def grid_layout(self, context):
+		bdx_tools = context.scene.bdx_tools
+		by_number = bdx_tools.plane_sect_number_or_size == "generate_by_number"
+		return se.grid_layout(self.dimensions, by_number, bdx_tools.plane_sect_number, bdx_tools.plane_sect_size, bdx_tools.plane_sect_number_mode)
 		
-		def mat_tris(mesh):
-			m_ps = {}
-			idx_tri = 0
-			for p in mesh.polygons:
-				mat = mesh.materials[p.material_index] if mesh.materials else None
-				mat_name = mat.name if mat else "__BDX_DEFAULT"
-				if not mat_name in m_ps:
-					m_ps[mat_name] = []
-					
-				m_ps[mat_name].append(idx_tri)
-				idx_tri += 1
-				
-				if len(p.loop_indices) > 3:
-					m_ps[mat_name].append(idx_tri)
-					idx_tri += 1
-					
-			return m_ps
-			
-		def vertices(mesh):
+	def estimate(self, context):
+		bdx_tools = context.scene.bdx_tools
+		key_arrays = (bdx_tools.plane_sect_apply_modifiers, bdx_tools.plane_sect_modifiers_settings.upper())
+		numb, size = self.grid_layout(context)
+		key = key_arrays + tuple(numb) + tuple(size) + (bdx_tools.plane_sect_merge_materials,)
+		if self.preview_key != key:
+			if self.preview_arrays_key != key_arrays:
+				self.preview_arrays = source_arrays(context.scene, self.originals, *key_arrays)
+				self.preview_arrays_key = key_arrays
+			co, tris, tri_mat, tri_smooth, tri_uvs, tri_normals, materials = self.preview_arrays
+			if bdx_tools.plane_sect_merge_materials:
+				remap, materials = merged_materials(materials)
+				tri_mat = remap[tri_mat]
+			center = co.mean(axis=0)
+			off = se.grid_offset(center, size)
+			grid = se.Grid(numb, size, (center[0] - off[0], center[1] - off[1]))
+			self.preview = se.estimate(co[:, :2] - off, tris, tri_mat, materials, grid)
+			self.preview_key = key
+		return self.preview
+		
+	def execute(self, context):
+		if self.error:
+			return {"CANCELLED"}
 			
-			class EmptyUV:
-				uv = (0.0, 0.0)
-				def __getitem__(self, index):
-					return self
+		for step in self.run(context):
+			pass
 			
-			def flip_uv(uv):
-				uv[1] = 1 - uv[1]
-				
-			def triform(loop_indices):
-				indices = list(loop_indices)
-				if len(indices) < 4:
-					return indices
-				return [indices[i] for i in (0, 1, 2, 2, 3, 0)]
-				
-			clnors = [0.0] * 3 * len(mesh.loops)
-			mesh.loops.foreach_get("normal", clnors)
-			uv_act = mesh.uv_layers.active
-			uv_layer = uv_act.data if uv_act is not None else EmptyUV()
-			loop_vert = {l.index: l.vertex_index for l in mesh.loops}
-			verts = []
-			for poly in mesh.polygons:
-				for li in triform(poly.loop_indices):
-					vert = mesh.vertices[loop_vert[li]]
-					vert_co = list(vert.co)
-					vert_normal = [clnors[li*3], clnors[li*3+1], clnors[li*3+2]]
-					vert_uv = list(uv_layer[li].uv)
-					flip_uv(vert_uv)
-					verts += vert_co + vert_normal + vert_uv
-					
-			return verts
+		return {"FINISHED"}
+		
+	def run(self, context):
+		
+		# With a scratch scene (NumPy backend), temp data is linked to a new scene holding the
+		# originals and the objects their particles duplicate, never shown: only the final
+		# sections are linked to the user's scene, the data API way, and the operators making
+		# particles real run on the scratch scene through a context override.
+		
+		bdx_tools = context.scene.bdx_tools
+		if not bdx_tools.plane_sect_scratch_scene or bdx_tools.plane_sect_backend != "numpy":
+			yield from self.run_scene(context, context.scene)
+			return
 			
-		if self.error:
-			return {"CANCELLED"}
+		objects = list(self.originals)
+		for original in self.originals:
+			for modifier in original.modifiers:
+				if modifier.type == "PARTICLE_SYSTEM" and modifier.particle_system.settings.dupli_object:
+					objects.append(modifier.particle_system.settings.dupli_object)
+		objects = [ob for ob in OrderedDict.fromkeys(objects) if ob.name in context.scene.objects]
+		
+		scratch = scratch_scene(context.scene, objects)
+		try:
+			yield from self.run_scene(context, scratch)
+		finally:
+			bpy.data.scenes.remove(scratch, do_unlink=True)
 			
-		if context.scene.bdx_tools.plane_sect_number_or_size == "generate_by_number":
-			self.sect_numb.x = context.scene.bdx_tools.plane_sect_number[0]
-			self.sect_numb.y = context.scene.bdx_tools.plane_sect_number[1]
-			self.sect_size.x = self.dimensions.x / self.sect_numb.x
-			self.sect_size.y = self.dimensions.y / self.sect_numb.y
-		else:
-			self.sect_size.x = context.scene.bdx_tools.plane_sect_size[0]
-			self.sect_size.y = context.scene.bdx_tools.plane_sect_size[1]
-			n_x = math.ceil(self.dimensions.x / self.sect_size.x)
-			n_y = math.ceil(self.dimensions.y / self.sect_size.y)
-			numb_mode = context.scene.bdx_tools.plane_sect_number_mode
-			if numb_mode == "use_automatic_numbering":
-				self.sect_numb.x = n_x
-				self.sect_numb.y = n_y
-			else:
-				i = 0 if numb_mode == "use_even_numbers" else 1
-				self.sect_numb.x = n_x + 1 - i if n_x % 2 else n_x + i
-				self.sect_numb.y = n_y + 1 - i if n_y % 2 else n_y + i
-				
+	def run_scene(self, context, sc):
+		
+		numb, size = self.grid_layout(context)
+		self.sect_numb.x, self.sect_numb.y = numb
+		self.sect_size.x, self.sect_size.y = size
+		
 		prof = ut.Profiler()
 		
 		print("\nSectionalizing Plane\n--------------------\n")
@@ -237,35 +736,33 @@ class PlaneSectionalizer(bpy.types.Operator):
 						
 						dupli_object = None
 						if settings.dupli_object:
-							dupli_object = context.scene.objects[settings.dupli_object.name]
-							tmp = ut.copy(context.scene, dupli_object, False, TEMP_SUFFIX)
+							dupli_object = sc.objects[settings.dupli_object.name]
+							tmp = ut.copy(sc, dupli_object, False, TEMP_SUFFIX)
 							settings.dupli_object = tmp
 							tmps.append(tmp)
 							
-						context.scene.objects.active = original
-						original.select = True
-						bpy.ops.object.duplicates_make_real()
+						before = {ob.as_pointer() for ob in sc.objects}
+						bpy.ops.object.duplicates_make_real(scene_override(context, sc, original, [original]))
 						settings.dupli_object = dupli_object
-						original.select = False
 						
-						selected_objects = list(context.selected_objects)
-						context.scene.objects.active = selected_objects[0]
-						bpy.ops.object.select_all(action="DESELECT")
-						context.scene.objects.active.select = True
-						for ob in selected_objects:
-							tmps_particles.append(ob)
-							ob.select = True
-							
-						bpy.ops.object.join()
-						particles = context.selected_objects[0]
+						duplicates = [ob for ob in sc.objects if ob.as_pointer() not in before]
+						if not duplicates:
+							continue
+						tmps_particles.extend(duplicates)
+						bpy.ops.object.join(scene_override(context, sc, duplicates[0], duplicates))
+						particles = duplicates[0]
 						tmps_particles.append(particles)
 						objects.append(particles)
 						particles.select = False
-					
+						
+		if context.scene.bdx_tools.plane_sect_backend == "numpy":
+			yield from self.run_arrays(context, sc, prof, objects, tmps, tmps_particles)
+			return
+			
 		print(prof.timed("Creating temp data"))
 		
 		if len(objects) == 1:
-			ob_tmp = ut.copy(context.scene, ob_base, True, TEMP_SUFFIX + ".000", context.scene.bdx_tools.plane_sect_apply_modifiers, context.scene.bdx_tools.plane_sect_modifiers_settings.upper())
+			ob_tmp = evaluated_copy(context.scene, ob_base, TEMP_SUFFIX + ".000", context.scene.bdx_tools.plane_sect_apply_modifiers, context.scene.bdx_tools.plane_sect_modifiers_settings.upper())
 			context.scene.objects.active = ob_tmp
 			ob_tmp.select = True
 			ob_base.select = False
@@ -273,7 +770,7 @@ class PlaneSectionalizer(bpy.types.Operator):
 		else:
 			tmp_objects = []
 			for ob in objects:
-				ob_tmp = ut.copy(context.scene, ob, True, TEMP_SUFFIX + ".000", context.scene.bdx_tools.plane_sect_apply_modifiers, context.scene.bdx_tools.plane_sect_modifiers_settings.upper())
+				ob_tmp = evaluated_copy(context.scene, ob, TEMP_SUFFIX + ".000", context.scene.bdx_tools.plane_sect_apply_modifiers, context.scene.bdx_tools.plane_sect_modifiers_settings.upper())
 				tmp_objects.append(ob_tmp)
 				ob.select = False
 				ob.hide = True
@@ -294,6 +791,9 @@ class PlaneSectionalizer(bpy.types.Operator):
 			
 			bpy.ops.object.join()
 			
+		yield "Creating temp data", 1, 1
+		
+		activate(context, ob_tmp)
 		bpy.ops.object.transform_apply(location=False, rotation=True, scale=True)
 		bpy.ops.object.origin_set(type="ORIGIN_GEOMETRY")
 		off = ob_tmp.location.copy()
@@ -302,71 +802,41 @@ class PlaneSectionalizer(bpy.types.Operator):
 		off.z = 0
 		loc = ob_tmp.location = ob_tmp.location - off
 		
-		bpy.ops.object.mode_set(mode="OBJECT")
-		bpy.ops.object.editmode_toggle()
-		bpy.ops.mesh.select_mode(type="FACE")
-		bpy.ops.mesh.select_all(action="SELECT")
+		print(prof.timed("Welding"))
 		
-		print(prof.timed("Beautifying"))
-		
-		bpy.ops.mesh.select_all()
-		bpy.ops.mesh.remove_doubles()
-		bpy.ops.mesh.quads_convert_to_tris()
-		bpy.ops.mesh.beautify_fill()
+		weld(ob_tmp)
 		
 		if context.scene.bdx_tools.plane_sect_decimate:
+			self.decimate(context, prof, ob_tmp)
 			
-			if context.scene.bdx_tools.plane_sect_decimate_dissolve_angle_limit:
-				
-				print(prof.timed("Decimating - dissolve"))
-				
-				bpy.ops.mesh.beautify_fill()
-				bpy.ops.mesh.dissolve_limited(angle_limit=context.scene.bdx_tools.plane_sect_decimate_dissolve_angle_limit, delimit={"NORMAL", "MATERIAL", "SEAM", "SHARP", "UV"})
-				bpy.ops.mesh.select_all()
-				bpy.ops.mesh.remove_doubles()
-				bpy.ops.mesh.quads_convert_to_tris()
-				bpy.ops.mesh.beautify_fill()
-				
-			if context.scene.bdx_tools.plane_sect_decimate_collapse_ratio < 1:
-				
-				print(prof.timed("Decimating - collapse"))
-				
-				bpy.ops.mesh.decimate(ratio=context.scene.bdx_tools.plane_sect_decimate_collapse_ratio)
-				bpy.ops.mesh.select_all()
-				bpy.ops.mesh.remove_doubles()
-				bpy.ops.mesh.quads_convert_to_tris()
-				bpy.ops.mesh.beautify_fill()
-				
-		bpy.ops.object.editmode_toggle()
+		yield "Welding", 1, 1
 		
 		print(prof.timed("Separating loose parts"))
 		
+		activate(context, ob_tmp)
 		bpy.ops.mesh.separate(type="LOOSE")
 		parts = {ob : [] for ob in context.selected_objects}
 		bpy.ops.object.select_all(action="DESELECT")
 		
+		yield "Separating loose parts", 1, 1
+		
 		print(prof.timed("Multisecting"))
 		
-		dir_x = numpy.sign(int(loc.x))
-		dir_y = numpy.sign(int(loc.y))
-		start_x = 0 if dir_x < 0 else 1
-		start_y = 0 if dir_y < 0 else 1
-		end_x = int(self.sect_numb.x) + abs(dir_x) + 1
-		end_y = int(self.sect_numb.y) + abs(dir_y) + 1
+		grid = se.Grid(self.sect_numb, self.sect_size, loc)
+		start_x, start_y = grid.start
+		end_x, end_y = grid.end
 		
-		for part_base in parts.keys():
+		for n, part_base in enumerate(parts.keys()):
 			
 			tmps.append(part_base)
 			
 			ob_sect = ut.copy(context.scene, part_base)
 			ob_sect.name = ob_base.name + PART_SUFFIX + ".000"
 			ob_sect.data.name = ob_base.data.name + PART_SUFFIX + ".000"
-			context.scene.objects.active = ob_sect
 			parts[part_base].append(ob_sect)
 			
-			bpy.ops.object.editmode_toggle()
-			
-			bm = bmesh.from_edit_mesh(ob_sect.data)
+			bm = bmesh.new()
+			bm.from_mesh(ob_sect.data)
 			
 			for i in range(start_x, end_x):
 				try:
@@ -388,23 +858,22 @@ class PlaneSectionalizer(bpy.types.Operator):
 				except RuntimeError:
 					continue
 					
-			bmesh.update_edit_mesh(ob_sect.data)
+			bm.to_mesh(ob_sect.data)
+			bm.free()
+			ob_sect.data.update()
 			
-			bpy.ops.object.editmode_toggle()
+			yield "Multisecting", n + 1, len(parts)
 			
-		bm.free()
-		del bm
-		
 		print(prof.timed("Separating sections"))
 		
-		for objects in parts.values():
-			ob = objects[0]
-			context.scene.objects.active = ob
-			ob.select = True
+		for n, objects in enumerate(parts.values()):
+			activate(context, objects[0])
 			bpy.ops.mesh.separate(type="LOOSE")
 			objects[:] = context.selected_objects
 			bpy.ops.object.select_all(action="DESELECT")
 			
+			yield "Separating sections", n + 1, len(parts)
+			
 		print(prof.timed("Transferring normals"))
 		
 		n = 1
@@ -419,12 +888,8 @@ class PlaneSectionalizer(bpy.types.Operator):
 				
 				n += 1
 				
-				context.scene.objects.active = ob
-				bpy.ops.object.editmode_toggle()
-				bpy.ops.mesh.select_all()
-				bpy.ops.mesh.remove_doubles()
-				bpy.ops.mesh.quads_convert_to_tris()
-				bpy.ops.object.editmode_toggle()
+				activate(context, ob)
+				weld(ob)
 				
 				ob.data.use_auto_smooth = True
 				bpy.ops.mesh.customdata_custom_splitnormals_add()
@@ -436,6 +901,9 @@ class PlaneSectionalizer(bpy.types.Operator):
 				cn.data_types_loops = {"CUSTOM_NORMAL"}
 				cn.mix_factor = 1
 				bpy.ops.object.modifier_apply(modifier=cn.name)
+				ob.select = False
+				
+				yield "Transferring normals", n - 1, n_total
 				
 		print(prof.timed("Finalizing sections"))
 		
@@ -456,10 +924,10 @@ class PlaneSectionalizer(bpy.types.Operator):
 		for i in range(len(sect_locations)):
 			sect_parts[ut.id(i, "", id_length)] = []
 			
+		n = 0
 		for objects in parts.values():
 			for ob in objects:
-				context.scene.objects.active = ob
-				ob.select = True
+				activate(context, ob)
 				
 				inside = False
 				bpy.ops.object.origin_set(type="ORIGIN_GEOMETRY")
@@ -476,6 +944,9 @@ class PlaneSectionalizer(bpy.types.Operator):
 					
 				ob.select = False
 				
+				n += 1
+				yield "Finalizing sections", n, n_total
+				
 		i = 0
 		id_length = max(len(str(len(sect_parts))), 3)
 		for parts in sect_parts.values():
@@ -513,6 +984,8 @@ class PlaneSectionalizer(bpy.types.Operator):
 					sections.append(sect)
 					i += 1
 					
+					yield "Finalizing sections", n_total, n_total
+					
 		context.scene.cursor_location = cursor_location
 		
 		print(prof.timed("Calculating custom normals"))
@@ -522,6 +995,8 @@ class PlaneSectionalizer(bpy.types.Operator):
 			sect.select = True
 			sect.data.calc_normals_split()
 			
+		yield "Calculating custom normals", 1, 1
+		
 		if off.length:
 			
 			print(prof.timed("Repositioning sections"))
@@ -531,75 +1006,12 @@ class PlaneSectionalizer(bpy.types.Operator):
 				
 		print(prof.timed("Removing temp data"))
 		
-		for ob in tmps:
-			me = ob.data
-			bpy.data.objects.remove(ob, do_unlink=True)
-			bpy.data.meshes.remove(me, do_unlink=True)
-			
-		for ob in tmps_particles:
-			bpy.data.objects.remove(ob, do_unlink=True)
-			
+		remove_temp_data(tmps, tmps_particles)
+		
 		if not context.scene.bdx_tools.plane_sect_gen_options == "generate_sections":
 			
-			print(prof.timed("Extracting BDX data"))
+			yield from self.export(context, ob_base.name, [(sect.name, sect.location, extract(sect.data)) for sect in sections], prof)
 			
-			num_vertices_max = 0
-			
-			tfs = 3 * 8
-			data = {}
-			data_objects = OrderedDict()
-			for sect in sections:
-				section = {}
-				mesh = sect.data
-				m_tris = mat_tris(mesh)
-				verts = vertices(mesh)
-				m_verts = OrderedDict()
-				materials = []
-				for m in mesh.materials:
-					if m is not None:
-						materials.append(m.name)
-				if len(materials) == 0:
-					materials.append("__BDX_DEFAULT")
-				
-				approximate = context.scene.bdx_tools.plane_sect_approximate
-				approx_ndigits = context.scene.bdx_tools.plane_sect_approx_ndigits
-				
-				for mat in materials:
-					if mat in m_tris.keys():
-						m, tris = mat, m_tris[mat]
-						l = numpy.concatenate([verts[i * tfs : i * tfs + tfs] for i in tris]).tolist()
-						if approximate:
-							l = [round(f, approx_ndigits) for f in l]
-						m_verts[m] = l
-						num_vertices = len(l) // 8
-						num_vertices_max = max(num_vertices, num_vertices_max)
-						print(prof.timed("\"" + m + "\" of " + sect.name, " has ", num_vertices, " vertices."))
-						
-				section["model"] = m_verts
-				section["position"] = list(sect.location)
-				data_objects[sect.name] = section
-				data["objects"] = data_objects
-				offset = []
-				for i, n in enumerate(self.sect_numb):
-					offset.append(0 if n % 2 else self.sect_size[i] * 0.5)
-				data["offset"] = offset + [0]
-				data["size"] = list(self.sect_size) + [0]
-				
-			if (num_vertices_max > 4095):
-				print("WARNING: Meshes with more than 4095 vertices (1365 triangles) per material are not supported in BDX.\nAt least one section has", num_vertices_max, "vertices, or", num_vertices_max // 3, "triangles. Exporting json file aborted.")
-				
-			else:
-				print(prof.timed("Exporting json file"))
-				
-				root = ut.assets_root() if ut.project_root() else bpy.path.abspath("//")
-				folder = "sections"
-				dir = os.path.join(root, folder)
-				if not os.path.exists(dir):
-					os.mkdir(dir)
-				file_path = os.path.join(dir, ob_base.name + ".sctx")
-				with open(file_path, 'w') as f:
-					json.dump(data, f)
-					
 			for original in self.originals:
 				original.select = True	
 				context.scene.objects.active = original
@@ -620,13 +1032,302 @@ class PlaneSectionalizer(bpy.types.Operator):
 		print(prof.timed("Finished generating ", len(sections), " (", round(self.sect_size.x, 1), " X ", round(self.sect_size.y, 1), ") sections in"))
 		print("\n")
 		
-		return {"FINISHED"}
+	def decimate(self, context, prof, ob):
+		
+		bpy.ops.object.mode_set(mode="OBJECT")
+		bpy.ops.object.editmode_toggle()
+		bpy.ops.mesh.select_mode(type="FACE")
+		bpy.ops.mesh.select_all(action="SELECT")
+		
+		if context.scene.bdx_tools.plane_sect_decimate_dissolve_angle_limit:
+			
+			print(prof.timed("Decimating - dissolve"))
+			
+			bpy.ops.mesh.beautify_fill()
+			bpy.ops.mesh.dissolve_limited(angle_limit=context.scene.bdx_tools.plane_sect_decimate_dissolve_angle_limit, delimit={"NORMAL", "MATERIAL", "SEAM", "SHARP", "UV"})
+			
+		if context.scene.bdx_tools.plane_sect_decimate_collapse_ratio < 1:
+			
+			print(prof.timed("Decimating - collapse"))
+			
+			bpy.ops.mesh.decimate(ratio=context.scene.bdx_tools.plane_sect_decimate_collapse_ratio)
+			
+		bpy.ops.object.editmode_toggle()
+		
+		print(prof.timed("Welding"))
+		
+		weld(ob)
+		
+	def export(self, context, name, sections, prof):
+		
+		# Writes sections, given as (name, position, BDX vertices per material), to name.sctx,
+		# and merged into the cells of each coarser size, to name_xFACTOR.sctx.
+		
+		offset = sctx.offset(self.sect_numb, self.sect_size)
+		size = [self.sect_size[0], self.sect_size[1]]
+		yield from self.export_file(context, name, sections, offset, size, prof)
+		
+		for factor in sorted(int(f) for f in context.scene.bdx_tools.plane_sect_coarser_sizes):
+			
+			print(prof.timed("Merging sections x" + str(factor)))
+			
+			coarse = coarse_sections(name, sections, offset, size, factor)
+			yield from self.export_file(context, name + "_x" + str(factor), coarse, sctx.coarse_offset(offset, size, factor), [s * factor for s in size], prof)
+			
+	def export_file(self, context, name, sections, offset, size, prof):
+		
+		print(prof.timed("Extracting BDX data"))
+		
+		num_vertices_max = 0
+		
+		approximate = context.scene.bdx_tools.plane_sect_approximate
+		approx_ndigits = context.scene.bdx_tools.plane_sect_approx_ndigits
+		merge = context.scene.bdx_tools.plane_sect_merge_materials
+		optimize = context.scene.bdx_tools.plane_sect_optimize_cache
+		collision = context.scene.bdx_tools.plane_sect_collision
+		collision_tolerance = context.scene.bdx_tools.plane_sect_collision_tolerance
+		
+		cells = se.cell_indices([position for sect_name, position, m_verts in sections], offset, size) if sections else []
+		links = se.neighbours(cells)
+		
+		data = {}
+		data_objects = OrderedDict()
+		for k, (sect_name, position, m_verts) in enumerate(sections):
+			layers = None
+			if optimize:
+				m_verts = m_verts.copy()
+				for m, verts in m_verts.items():
+					m_verts[m], acmr_before, acmr_after = se.reorder_flat(verts)
+					print(prof.timed("\"" + m + "\" of " + sect_name, " ACMR ", round(acmr_before, 3), " -> ", round(acmr_after, 3)))
+			if merge:
+				m_verts, layers = se.merge_blocks(m_verts, [shader_key(m) for m in m_verts])
+			for m, verts in m_verts.items():
+				num_vertices = len(verts)
+				num_vertices_max = max(num_vertices, num_vertices_max)
+				print(prof.timed("\"" + m + "\" of " + sect_name, " has ", num_vertices, " vertices."))
+				
+			neighbours = [sections[l][0] if l is not None else None for l in links[k]]
+			data_objects[sect_name] = sctx.section(m_verts, position, cells[k], neighbours, size, collision_tolerance if collision else None, layers, optimize)
+			
+			yield "Extracting BDX data", k + 1, len(sections)
+			
+		data["objects"] = data_objects
+		data["offset"] = offset
+		data["size"] = list(size) + [0]
+		
+		if (num_vertices_max > se.VERTICES_MAX):
+			print("WARNING: Meshes with more than 4095 vertices (1365 triangles) per material are not supported in BDX.\nAt least one section has", num_vertices_max, "vertices, or", num_vertices_max // 3, "triangles. Exporting json file aborted.")
+			
+		else:
+			print(prof.timed("Exporting json file"))
+			
+			root = ut.assets_root() if ut.project_root() else bpy.path.abspath("//")
+			folder = "sections"
+			dir = os.path.join(root, folder)
+			if not os.path.exists(dir):
+				os.mkdir(dir)
+			file_path = os.path.join(dir, name + ".sctx")
+			with open(file_path, 'w') as f:
+				sctx.dump(data, f, approx_ndigits if approximate else None)
+				
+			yield "Exporting json file", 1, 1
+			
+	def run_arrays(self, context, sc, prof, objects, tmps, tmps_particles):
+		
+		# NumPy backend: the objects are read once as arrays and clipped to the grid cells by
+		# sections.sectionalize, in a pool of worker processes; only the final sections become
+		# Blender objects. Temp data is linked to sc.
+		
+		bdx_tools = context.scene.bdx_tools
+		gen_options = bdx_tools.plane_sect_gen_options
+		ob_base = self.originals[-1]
+		
+		print(prof.timed("Creating temp data"))
+		
+		co, tris, tri_mat, tri_smooth, tri_uvs, tri_normals, materials = source_arrays(sc, objects, bdx_tools.plane_sect_apply_modifiers, bdx_tools.plane_sect_modifiers_settings.upper())
+		for ob in self.originals:
+			ob.select = False
+			ob.hide = True
+			
+		yield "Creating temp data", 1, 1
+		
+		print(prof.timed("Welding"))
+		
+		center = co.mean(axis=0)
+		co, tris, keep = se.weld(co, tris, WELD_TOLERANCE)
+		tri_mat, tri_smooth, tri_uvs, tri_normals = tri_mat[keep], tri_smooth[keep], tri_uvs[keep], tri_normals[keep]
+		
+		if bdx_tools.plane_sect_decimate:
+			me = mesh_from_arrays(ob_base.data.name + TEMP_SUFFIX, co, tris, tri_mat, tri_smooth, tri_uvs, [bpy.data.materials.get(m) for m in materials], tri_normals)
+			ob_tmp = bpy.data.objects.new(ob_base.name + TEMP_SUFFIX, me)
+			sc.objects.link(ob_tmp)
+			
+			print(prof.timed("Decimating"))
+			
+			decimate(sc, ob_tmp, bdx_tools.plane_sect_decimate_dissolve_angle_limit, bdx_tools.plane_sect_decimate_collapse_ratio)
+			
+			print(prof.timed("Welding"))
+			
+			weld(ob_tmp)
+			co, loop_start, loop_total, loop_vertices, poly_mat, poly_smooth, loop_uvs = read_mesh(ob_tmp.data)
+			tri_loops, tri_poly = se.triangulate(loop_start, loop_total)
+			tris, tri_mat, tri_smooth, tri_uvs = loop_vertices[tri_loops], poly_mat[tri_poly], poly_smooth[tri_poly], loop_uvs[tri_loops]
+			tri_normals = read_normals(ob_tmp.data)[tri_loops]
+			tmps.append(ob_tmp)
+			
+		numb, size = self.grid_layout(context)
+		off = se.grid_offset(center, size)
+		grid = se.Grid(numb, size, (center[0] - off[0], center[1] - off[1]))
+		co = co - (off[0], off[1], 0)
+		
+		yield "Welding", 1, 1
+		
+		print(prof.timed("Multisecting"))
+		
+		corners = numpy.concatenate((co[tris], tri_normals, tri_uvs), axis=2)
+		workers = bdx_tools.plane_sect_workers or os.cpu_count() or 1
+		cells = yield from phase("Multisecting", se.sectionalize(corners, tri_mat, grid, workers, WELD_TOLERANCE))
+		
+		print(prof.timed("Finalizing sections"))
+		
+		cell_verts = OrderedDict()
+		for cell, m, verts in cells:
+			verts[:, 7] = 1 - verts[:, 7]
+			cell_verts.setdefault(cell, OrderedDict())[materials[m]] = verts
+			
+		locations = grid.locations()
+		id_length = max(len(str(len(locations))), 3)
+		sections = []
+		for i, (cell, m_verts) in enumerate(cell_verts.items()):
+			x, y = locations[cell]
+			sections.append((ob_base.name + SECT_SUFFIX + ut.id(i, ".", id_length), (x + off[0], y + off[1], 0.0), m_verts))
+			
+			yield "Finalizing sections", i + 1, len(cell_verts)
+			
+		if gen_options != "save_json_file":
+			
+			print(prof.timed("Calculating custom normals"))
+			
+			for k, section in enumerate(sections):
+				section_object(context.scene, *section)
+				
+				yield "Calculating custom normals", k + 1, len(sections)
+				
+		print(prof.timed("Removing temp data"))
+		
+		remove_temp_data(tmps, tmps_particles)
+		
+		if gen_options != "generate_sections":
+			
+			yield from self.export(context, ob_base.name, sections, prof)
+			
+			for original in self.originals:
+				original.select = True
+				context.scene.objects.active = original
+				
+		del self.originals[:]
 		
-def register():
-	bpy.utils.register_class(PlaneSectionalizer)
+		if gen_options == "save_json_file":
+			ob_base.hide = False
+			
+		print(prof.timed("Finished generating ", len(sections), " (", round(size[0], 1), " X ", round(size[1], 1), ") sections in"))
+		print("\n")
+		
+class PlaneSectionalizerModal(PlaneSectionalizer):
+	
+	# Runs the same pipeline from a timer, a bounded chunk of parts or sections per tick;
+	# Esc cancels and removes the data the pipeline created, told apart from the user's as the
+	# data created during ticks. Only view navigation passes through meanwhile: undo, loading
+	# or deleting could free data the suspended pipeline still refers to.
 	
-def unregister():
-	bpy.utils.unregister_class(PlaneSectionalizer)
+	timer = None
+	steps = None
+	progress = None
 	
-if __name__ == "__main__":
-	register()
+	def execute(self, context):
+		if self.error:
+			return {"CANCELLED"}
+			
+		self.objects_created = set()
+		self.meshes_created = set()
+		self.cursor_location = context.scene.cursor_location.copy()
+		
+		self.steps = self.run(context)
+		self.progress = Progress()
+		
+		wm = context.window_manager
+		wm.progress_begin(0, len(PHASES) + 2 * len(context.scene.bdx_tools.plane_sect_coarser_sizes))
+		self.timer = wm.event_timer_add(TICK_INTERVAL, context.window)
+		wm.modal_handler_add(self)
+		
+		return {"RUNNING_MODAL"}
+		
+	def modal(self, context, event):
+		if event.type == "ESC":
+			self.cancel(context)
+			return {"CANCELLED"}
+			
+		if event.type != "TIMER":
+			return {"PASS_THROUGH"} if event.type in NAVIGATION_EVENTS else {"RUNNING_MODAL"}
+			
+		objects = {ob.as_pointer() for ob in bpy.data.objects}
+		meshes = {me.as_pointer() for me in bpy.data.meshes}
+		start = time.time()
+		try:
+			try:
+				while time.time() - start < TICK_BUDGET:
+					self.progress.step(self.steps)
+			finally:
+				self.objects_created = created(bpy.data.objects, objects, self.objects_created)
+				self.meshes_created = created(bpy.data.meshes, meshes, self.meshes_created)
+		except StopIteration:
+			self.stop(context)
+			for line in self.progress.throughput():
+				print(line)
+			self.report({"INFO"}, "Plane sectionalized")
+			return {"FINISHED"}
+		except Exception as e:
+			self.cancel(context)
+			traceback.print_exc()
+			self.report({"ERROR"}, "Plane sectionalizing failed: " + str(e))
+			return {"CANCELLED"}
+			
+		context.window_manager.progress_update(self.progress.value)
+		
+		return {"PASS_THROUGH"}
+		
+	def stop(self, context):
+		wm = context.window_manager
+		wm.event_timer_remove(self.timer)
+		wm.progress_end()
+		self.timer = None
+		
+	def cancel(self, context):
+		if self.timer is None:
+			return
+			
+		self.steps.close()
+		self.stop(context)
+		
+		if context.mode != "OBJECT":
+			bpy.ops.object.mode_set(mode="OBJECT")
+			
+		for ob in [ob for ob in bpy.data.objects if ob.as_pointer() in self.objects_created]:
+			bpy.data.objects.remove(ob, do_unlink=True)
+			
+		for me in [me for me in bpy.data.meshes if me.as_pointer() in self.meshes_created and not me.users]:
+			bpy.data.meshes.remove(me, do_unlink=True)
+			
+		context.scene.cursor_location = self.cursor_location
+		
+		for original in self.originals:
+			original.hide = False
+			original.select = True
+			context.scene.objects.active = original
+			
+		del self.originals[:]
+		
+		for line in self.progress.throughput():
+			print(line)
+		self.report({"WARNING"}, "Plane sectionalizing cancelled")
+		
\ No newline at end of file
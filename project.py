@@ -0,0 +1,280 @@
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+
+# Blender-free project utils: every function takes the BDX project root explicitly,
+# so this module can be imported by the add-on or run on its own:
+#
+#	python project.py PROJECT_ROOT android --screen-orientation portrait --use-vibrator true
+#	python project.py PROJECT_ROOT java --sync
+
+# path utils
+
+p = os.path
+j = p.join
+
+def assets_root(project_root):
+	return j(project_root, "android", "assets", "bdx")
+	
+def src_root(project_root, project="core", target_file="BdxApp.java"):
+	for root, dirs, files in os.walk(j(project_root, project, "src")):
+		if target_file in files:
+			return root
+			
+def android_launcher(project_root, target_file="AndroidLauncher.java"):
+	return j(src_root(project_root, "android", target_file), target_file)
+	
+def android_manifest(project_root, target_file="AndroidManifest.xml"):
+	return j(project_root, "android", target_file)
+	
+# text utils
+
+def lines(file_path):
+	with open(file_path, 'r') as f:
+		return f.readlines()
+	return
+	
+def index_lines(lines, patterns):
+	index = {}
+	for i, line in enumerate(lines):
+		for pattern in patterns:
+			if pattern not in index and pattern in line:
+				index[pattern] = i
+	return index
+	
+def replace_line(index, lines, new_line):
+	lines[index] = new_line + "\n";
+	
+def insert_line(index, lines, new_line):
+	lines.insert(index, new_line + "\n")
+	
+def write_lines_atomic(lines, file_path):
+	fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=p.dirname(file_path))
+	try:
+		with os.fdopen(fd, 'w') as f:
+			f.writelines(lines)
+		if p.exists(file_path):
+			shutil.copymode(file_path, tmp_path)
+		os.replace(tmp_path, file_path)
+	except BaseException:
+		os.remove(tmp_path)
+		raise
+		
+# java utils
+
+def java_package_line(pack_name):
+	return "package " + pack_name + ";"
+	
+def java_pack_name(project_root):
+	with open(j(src_root(project_root), "BdxApp.java"), 'r') as f:
+		_, package = f.readline().split()
+	return package[:-1]
+	
+def java_package(pack_name, rel_dir=p.curdir):
+	
+	# The package of java sources in rel_dir of the source root (where BdxApp.java is, and
+	# where BDX writes the java texts of the blend), pack_name being BdxApp's package.
+	
+	return pack_name if rel_dir == p.curdir else ".".join([pack_name] + rel_dir.split(os.sep))
+	
+def java_package_fixed(lines, package):
+	
+	# The lines of a java source with its package line replaced, or inserted, for package;
+	# None if it is in sync already (only the first line is read).
+	
+	line = java_package_line(package)
+	if lines and lines[0].rstrip("\r\n") == line:
+		return None
+	lines = list(lines)
+	if lines and lines[0].startswith("package "):
+		replace_line(0, lines, line)
+	else:
+		insert_line(0, lines, line)
+	return lines
+	
+def java_files(project_root):
+	root = src_root(project_root)
+	pack_name = java_pack_name(project_root)
+	for dir, dirs, files in os.walk(root):
+		name = java_package(pack_name, p.relpath(dir, root))
+		for f in sorted(files):
+			if f.endswith(".java"):
+				yield j(dir, f), name
+				
+def java_pack_errors(project_root):
+	errors = []
+	for file_path, name in java_files(project_root):
+		with open(file_path, 'r') as f:
+			if java_package_fixed([f.readline()], name) is not None:
+				errors.append(file_path)
+	return errors
+	
+def java_pack_sync(project_root):
+	errors = []
+	for file_path, name in java_files(project_root):
+		l = java_package_fixed(lines(file_path), name)
+		if l is not None:
+			write_lines_atomic(l, file_path)
+			errors.append(file_path)
+	return errors
+	
+# android utils
+
+SURFACEVIEW = "com.badlogic.gdx.backends.android.surfaceview."
+
+class AndroidConfig:
+	
+	manifest_keys = ("screenOrientation", "VIBRATE", "</application>")
+	launcher_keys = ("resolutionStrategy", "useAccelerometer", "useGyroscope", "useCompass", "AndroidApplicationConfiguration()", "import " + SURFACEVIEW + "RatioResolutionStrategy;")
+	
+	settings = ("screen_orientation", "resolution_strategy", "use_vibrator", "use_accelerometer", "use_gyroscope", "use_compass")
+	
+	def __init__(self, launcher, manifest):
+		self.launcher = launcher
+		self.manifest = manifest
+		self.launcher_lines = lines(launcher)
+		self.manifest_lines = lines(manifest)
+		self.launcher_text = "".join(self.launcher_lines)
+		self.manifest_text = "".join(self.manifest_lines)
+		self.index()
+		
+	@classmethod
+	def from_project(cls, project_root):
+		return cls(android_launcher(project_root), android_manifest(project_root))
+		
+	def index(self):
+		self.launcher_index = index_lines(self.launcher_lines, self.launcher_keys)
+		self.manifest_index = index_lines(self.manifest_lines, self.manifest_keys)
+		
+	# manifest
+	
+	@property
+	def screen_orientation(self):
+		return self.manifest_lines[self.manifest_index["screenOrientation"]].split("=")[1].strip("\"\n")
+		
+	@screen_orientation.setter
+	def screen_orientation(self, value):
+		if value != self.screen_orientation:
+			new_line = "\t\t\tandroid:screenOrientation=\"" + value + "\""
+			replace_line(self.manifest_index["screenOrientation"], self.manifest_lines, new_line)
+			
+	@property
+	def use_vibrator(self):
+		return "VIBRATE" in self.manifest_index
+		
+	@use_vibrator.setter
+	def use_vibrator(self, value):
+		if value == self.use_vibrator:
+			return
+		if value:
+			new_line = "\t<uses-permission android:name=\"android.permission.VIBRATE\" />"
+			insert_line(self.manifest_index["</application>"] + 1, self.manifest_lines, new_line)
+		else:
+			del self.manifest_lines[self.manifest_index["VIBRATE"]]
+		self.index()
+		
+	# launcher
+	
+	@property
+	def resolution_strategy(self):
+		strategy = self.launcher_lines[self.launcher_index["resolutionStrategy"]].split("= new ")[1].strip(";\n")
+		return strategy.split(SURFACEVIEW)[-1]
+		
+	@resolution_strategy.setter
+	def resolution_strategy(self, value):
+		if value == self.resolution_strategy:
+			return
+		key_import = self.launcher_keys[-1]
+		if key_import in self.launcher_index:
+			replace_line(self.launcher_index[key_import], self.launcher_lines, "")
+		new_line = "\t\tconfig.resolutionStrategy = new " + SURFACEVIEW + value + ";"
+		replace_line(self.launcher_index["resolutionStrategy"], self.launcher_lines, new_line)
+		self.index()
+		
+	def flag(self, key, default):
+		if key not in self.launcher_index:
+			return default
+		line = self.launcher_lines[self.launcher_index[key]]
+		return "false" not in line if default else "true" in line
+		
+	def set_flag(self, key, default, value):
+		if value == self.flag(key, default):
+			return
+		new_line = "\t\tconfig." + key + " = " + str(value).lower() + ";"
+		if key in self.launcher_index:
+			replace_line(self.launcher_index[key], self.launcher_lines, new_line)
+		else:
+			insert_line(self.launcher_index["AndroidApplicationConfiguration()"] + 1, self.launcher_lines, new_line)
+			self.index()
+			
+	use_accelerometer = property(lambda self: self.flag("useAccelerometer", True), lambda self, value: self.set_flag("useAccelerometer", True, value))
+	use_gyroscope = property(lambda self: self.flag("useGyroscope", False), lambda self, value: self.set_flag("useGyroscope", False, value))
+	use_compass = property(lambda self: self.flag("useCompass", True), lambda self, value: self.set_flag("useCompass", True, value))
+	
+	# io
+	
+	def save(self):
+		written = []
+		for file_path, l, text in ((self.manifest, self.manifest_lines, self.manifest_text), (self.launcher, self.launcher_lines, self.launcher_text)):
+			if "".join(l) != text:
+				write_lines_atomic(l, file_path)
+				written.append(file_path)
+		self.launcher_text = "".join(self.launcher_lines)
+		self.manifest_text = "".join(self.manifest_lines)
+		return written
+		
+# command line
+
+def main(argv=None):
+	
+	def boolean(s):
+		if s.lower() not in ("true", "false"):
+			raise argparse.ArgumentTypeError("expected true or false")
+		return s.lower() == "true"
+		
+	parser = argparse.ArgumentParser(description="Configures a BDX project without Blender.")
+	parser.add_argument("project_root", help="BDX project folder (containing core/ and android/)")
+	commands = parser.add_subparsers(dest="command")
+	
+	android = commands.add_parser("android", help="print or change the Android configuration")
+	android.add_argument("--screen-orientation")
+	android.add_argument("--resolution-strategy")
+	for setting in AndroidConfig.settings[2:]:
+		android.add_argument("--" + setting.replace("_", "-"), type=boolean, metavar="{true,false}")
+		
+	java = commands.add_parser("java", help="check java package names, exits with 1 if not in sync")
+	java.add_argument("--sync", action="store_true", help="fix package names instead")
+	
+	args = parser.parse_args(argv)
+	
+	if not args.command:
+		parser.error("missing command")
+		
+	if not src_root(args.project_root):
+		parser.error("BDX project missing: " + args.project_root)
+		
+	if args.command == "android":
+		config = AndroidConfig.from_project(args.project_root)
+		for setting in config.settings:
+			value = getattr(args, setting)
+			if value is not None:
+				setattr(config, setting, value)
+		for file_path in config.save():
+			print("written: " + file_path)
+		for setting in config.settings:
+			print(setting + " = " + str(getattr(config, setting)))
+		return 0
+		
+	if args.sync:
+		for file_path in java_pack_sync(args.project_root):
+			print("synced: " + file_path)
+		return 0
+	errors = java_pack_errors(args.project_root)
+	for file_path in errors:
+		print("package not in sync: " + file_path)
+	return 1 if errors else 0
+	
+if __name__ == "__main__":
+	sys.exit(main())
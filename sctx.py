@@ -0,0 +1,328 @@
+import re
+import sys
+import json
+import mmap
+import numpy
+import argparse
+from collections import OrderedDict
+from collections.abc import Mapping
+
+try:
+	from . import sections as se
+except ImportError:
+	import sections as se
+	
+# Blender-free reading and writing of .sctx (BDX sections) files, also run on its own to
+# print and verify the sections of a file:
+#
+#	python sctx.py ASSETS/sections/Plane.sctx
+
+CHUNK = 1 << 16
+
+PLACEHOLDER = "__sctx_array_{}__"
+PLACEHOLDERS = re.compile(r'"__sctx_array_(\d+)__"')
+
+TRAILING_ZEROS = re.compile(r"0+,")
+NON_FINITE = re.compile(r"-?(?:nan|inf)(?:\.0)?")
+NON_FINITE_JSON = {"nan": "NaN", "-nan": "NaN", "inf": "Infinity", "-inf": "-Infinity"}
+
+DEFAULT_MATERIAL = "__BDX_DEFAULT"
+
+SEAM_TOLERANCE = 0.0001
+
+TOKENS = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\]:]')
+
+# writing
+
+def encode_fixed(a, ndigits):
+	
+	# Json numbers (each followed by a comma) of the float64 array a at fixed precision,
+	# composed as bytes by array operations: the digits of the magnitudes scaled by
+	# 10 ** ndigits and rounded, less the leading zeros of their integer part and the trailing
+	# zeros of their fraction. Magnitudes whose scaled value is too close to a rounding tie
+	# for float64 products to decide are rounded by formatting them one by one; None if a
+	# holds values too large for exact scaled digits, or not finite.
+	
+	scaled = numpy.abs(a) * 10.0 ** ndigits
+	if not (scaled < 2.0 ** 53).all():
+		return None
+	q = numpy.rint(scaled).astype(numpy.int64)
+	near = numpy.abs(scaled - numpy.floor(scaled) - 0.5) <= scaled * 2.0 ** -52
+	if near.any():
+		q[near] = [int((("%." + str(ndigits) + "f") % abs(f)).replace(".", "")) for f in a[near].tolist()]
+	whole, fraction = numpy.divmod(q, 10 ** ndigits)
+	
+	n_whole = len(str(int(whole.max()))) if len(a) else 1
+	n_fraction = max(ndigits, 1)
+	chars = numpy.empty((len(a), n_whole + n_fraction + 3), numpy.uint8)
+	keep = numpy.ones(chars.shape, bool)
+	chars[:, 0] = ord("-")
+	keep[:, 0] = numpy.signbit(a)
+	lead = numpy.zeros(len(a), bool)
+	for k in range(n_whole):
+		digit = whole // 10 ** (n_whole - 1 - k) % 10
+		lead |= digit != 0
+		chars[:, 1 + k] = digit + ord("0")
+		keep[:, 1 + k] = lead
+	keep[:, n_whole] = True
+	chars[:, n_whole + 1] = ord(".")
+	trail = numpy.zeros(len(a), bool)
+	for k in range(n_fraction - 1, -1, -1):
+		digit = fraction // 10 ** (ndigits - 1 - k) % 10 if ndigits else 0
+		trail |= digit != 0
+		chars[:, n_whole + 2 + k] = digit + ord("0")
+		keep[:, n_whole + 2 + k] = trail
+	keep[:, n_whole + 2] = True
+	chars[:, -1] = ord(",")
+	return chars[keep].tobytes().decode("ascii")
+	
+def encode_floats(a, ndigits=None):
+	
+	# Json array of the floats of a, formatted a chunk at a time; with ndigits, at fixed
+	# precision stripped of trailing zeros (by encode_fixed, unless a chunk has huge or non
+	# finite values), which parses to the same floats as the json of
+	# [round(f, ndigits) for f in a] (both round the exact binary value correctly).
+	
+	a = numpy.asarray(a).ravel()
+	if a.dtype.kind in "iu":
+		return "[" + ",".join(map(str, a.tolist())) + "]"
+		
+	parts = []
+	for start in range(0, len(a), CHUNK):
+		block = numpy.asarray(a[start:start + CHUNK], numpy.float64)
+		s = None if ndigits is None else encode_fixed(block, ndigits)
+		if s is None:
+			chunk = block.tolist()
+			if ndigits is None:
+				s = json.dumps(chunk, separators=(",", ":"))[1:-1] + ","
+			elif ndigits == 0:
+				s = "%.0f.0," * len(chunk) % tuple(chunk)
+			else:
+				s = TRAILING_ZEROS.sub(",", ("%." + str(ndigits) + "f,") * len(chunk) % tuple(chunk)).replace(".,", ".0,")
+			if ndigits is not None and not numpy.isfinite(block).all():
+				s = NON_FINITE.sub(lambda m: NON_FINITE_JSON[m.group().replace(".0", "")], s)
+		parts.append(s[:-1])
+	return "[" + ",".join(parts) + "]"
+	
+def dump(data, f, ndigits=None):
+	
+	# Like json.dump, numpy arrays in data being written flat by encode_floats.
+	
+	arrays = []
+	
+	def skeleton(o):
+		if isinstance(o, numpy.ndarray):
+			arrays.append(o)
+			return PLACEHOLDER.format(len(arrays) - 1)
+		if isinstance(o, dict):
+			return o.__class__((k, skeleton(v)) for k, v in o.items())
+		if isinstance(o, (list, tuple)):
+			return [skeleton(v) for v in o]
+		return o
+		
+	text = json.dumps(skeleton(data))
+	end = 0
+	for m in PLACEHOLDERS.finditer(text):
+		f.write(text[end:m.start()])
+		f.write(encode_floats(arrays[int(m.group(1))], ndigits))
+		end = m.end()
+	f.write(text[end:])
+	
+class Writer:
+	
+	# Writes a .sctx file a section at a time, for sections not fitting in memory at once.
+	
+	def __init__(self, f, ndigits=None):
+		self.f = f
+		self.ndigits = ndigits
+		self.count = 0
+		f.write('{"objects": {')
+		
+	def add(self, name, section):
+		self.f.write((", " if self.count else "") + json.dumps(name) + ": ")
+		dump(section, self.f, self.ndigits)
+		self.count += 1
+		
+	def close(self, offset, size):
+		self.f.write('}, "offset": ' + json.dumps(offset) + ', "size": ' + json.dumps(size) + "}")
+		
+def offset(numb, size):
+	return [0 if n % 2 else size[i] * 0.5 for i, n in enumerate(numb)] + [0]
+	
+def coarse_offset(offset, size, factor):
+	return [o + (factor - 1) * s * 0.5 for o, s in zip(offset[:2], size[:2])] + [0]
+	
+def section(m_verts, position, cell, neighbours, size, collision_tolerance=None, layers=None, optimize=False):
+	
+	# Json data of a section from its BDX vertices per material. Cell, neighbours (names of the
+	# 8 surrounding sections, None if empty, ordered as sections.NEIGHBOURS), local bounds and
+	# edge horizon heights are added for streaming and culling at runtime, with a collision
+	# heightfield or mesh given a tolerance, and the layers of merged materials. Optimized,
+	# collision mesh triangles and vertices are reordered for the vertex cache.
+	
+	co = numpy.concatenate([verts[:, :3] for verts in m_verts.values()])
+	data = OrderedDict()
+	data["model"] = m_verts
+	data["position"] = list(position)
+	data["cell"] = [int(c) for c in cell]
+	data["neighbours"] = neighbours
+	data["bounds"] = [co.min(axis=0).tolist(), co.max(axis=0).tolist()]
+	data["horizon"] = se.horizon(co, size, SEAM_TOLERANCE)
+	if collision_tolerance:
+		heights, positions, indices = se.collision(co.astype(numpy.float64), size, collision_tolerance)
+		if heights is not None:
+			data["collision"] = {"heightfield": {"nodes": [heights.shape[1], heights.shape[0]], "heights": heights}}
+		else:
+			if optimize:
+				positions, indices = se.reorder_indexed(positions, indices)
+			data["collision"] = {"positions": positions, "indices": indices}
+	if layers:
+		data["layers"] = OrderedDict((m, {"materials": mats, "index": index}) for m, (mats, index) in layers.items())
+	return data
+	
+# reading
+
+class Section:
+	
+	# One parsed section; model blocks are (n, 8) float32 arrays, of which positions, normals
+	# and uvs return views.
+	
+	def __init__(self, name, data):
+		self.name = name
+		self.data = data
+		self.position = data.get("position", [0.0, 0.0, 0.0])
+		self.model = OrderedDict((m, numpy.array(l, numpy.float32).reshape(-1, 8)) for m, l in data.get("model", {}).items())
+		
+	def vertices(self):
+		return numpy.concatenate(list(self.model.values())) if self.model else numpy.zeros((0, 8), numpy.float32)
+		
+	def positions(self, m):
+		return self.model[m][:, :3]
+		
+	def normals(self, m):
+		return self.model[m][:, 3:6]
+		
+	def uvs(self, m):
+		return self.model[m][:, 6:8]
+		
+class Sctx(Mapping):
+	
+	# Lazy mapping of the sections of a memory mapped .sctx file: opening only locates the
+	# sections (a scan of brackets and strings), a section is parsed when it is accessed.
+	
+	def __init__(self, file_path):
+		with open(file_path, "rb") as f:
+			self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		self.spans = OrderedDict()
+		self.cache = {}
+		
+		depth = 0
+		key = None
+		objects = None
+		for m in TOKENS.finditer(self.buffer):
+			t = m.group()
+			if t in (b"{", b"["):
+				if depth == 1 and key == b'"objects"':
+					objects = [m.start()]
+				elif depth == 2 and objects and len(objects) == 1:
+					name = json.loads(key.decode())
+					start = m.start()
+				depth += 1
+			elif t in (b"}", b"]"):
+				depth -= 1
+				if depth == 2 and objects and len(objects) == 1:
+					self.spans[name] = (start, m.end())
+				elif depth == 1 and objects and len(objects) == 1:
+					objects.append(m.end())
+			elif t == b":":
+				pass
+			else:
+				key = t
+				
+		header = self.buffer[:objects[0]] + b"{}" + self.buffer[objects[1]:] if objects else self.buffer[:]
+		self.header = json.loads(header.decode())
+		self.offset = self.header.get("offset", [0, 0, 0])
+		self.size = self.header.get("size", [0, 0, 0])
+		
+	def __getitem__(self, name):
+		if name not in self.cache:
+			start, end = self.spans[name]
+			self.cache[name] = Section(name, json.loads(self.buffer[start:end].decode()))
+		return self.cache[name]
+		
+	def __iter__(self):
+		return iter(self.spans)
+		
+	def __len__(self):
+		return len(self.spans)
+		
+	def close(self):
+		self.cache.clear()
+		self.buffer.close()
+		
+	def __enter__(self):
+		return self
+		
+	def __exit__(self, *args):
+		self.close()
+		
+# verification
+
+def boundary_length(co, tris, tolerance):
+	co, tris, keep = se.weld(co, tris, tolerance)
+	edges = numpy.sort(numpy.concatenate((tris[:, [0, 1]], tris[:, [1, 2]], tris[:, [2, 0]])), axis=1)
+	index, inverse = se.unique_rows(edges)
+	once = numpy.bincount(inverse, minlength=len(index)) == 1
+	e = edges[index[once]]
+	return float(numpy.linalg.norm(co[e[:, 1]] - co[e[:, 0]], axis=1).sum())
+	
+def area(co, tris):
+	v = co[tris]
+	return float(numpy.linalg.norm(numpy.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0]), axis=1).sum() * 0.5)
+	
+def verify(sections, source=None, tolerance=0.001):
+	
+	# Returns a list of problems: blocks over the vertex limit, vertices outside their cell
+	# and, given the source mesh as world space (co, tris) arrays, a total area or an open
+	# boundary length (seams that do not close, holes) differing from the source.
+	
+	problems = []
+	half = numpy.array(sections.size[:2]) * 0.5
+	cos = []
+	for name, section in sections.items():
+		for m, verts in section.model.items():
+			if len(verts) > se.VERTICES_MAX:
+				problems.append(name + ": \"" + m + "\" has " + str(len(verts)) + " vertices, more than " + str(se.VERTICES_MAX))
+			outside = (numpy.abs(verts[:, :2]) > half + tolerance).any(axis=1).sum()
+			if outside:
+				problems.append(name + ": \"" + m + "\" has " + str(outside) + " vertices outside its cell")
+		if source is not None:
+			cos.append(section.vertices()[:, :3] + numpy.array(section.position, numpy.float32))
+			
+	if source is not None:
+		co = numpy.concatenate(cos).astype(numpy.float64) if cos else numpy.zeros((0, 3))
+		tris = numpy.arange(len(co)).reshape(-1, 3)
+		for what, ours, theirs in (("area", area(co, tris), area(*source)), ("open boundary length", boundary_length(co, tris, tolerance), boundary_length(source[0], source[1], tolerance))):
+			if abs(ours - theirs) > tolerance * max(theirs, 1):
+				problems.append(what + " " + str(round(ours, 4)) + " differs from the source " + str(round(theirs, 4)))
+	return problems
+	
+def main(argv=None):
+	
+	parser = argparse.ArgumentParser(description="Prints and verifies the sections of a .sctx file.")
+	parser.add_argument("file", help=".sctx file")
+	parser.add_argument("--tolerance", type=float, default=0.001)
+	args = parser.parse_args(argv)
+	
+	with Sctx(args.file) as sections:
+		print(str(len(sections)) + " sections, size " + str(sections.size[:2]) + ", offset " + str(sections.offset[:2]))
+		for name, section in sections.items():
+			print(name + ": " + ", ".join("\"" + m + "\" " + str(len(v)) for m, v in section.model.items()))
+		problems = verify(sections, tolerance=args.tolerance)
+		
+	for problem in problems:
+		print("problem: " + problem)
+	return 1 if problems else 0
+	
+if __name__ == "__main__":
+	sys.exit(main())
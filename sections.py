@@ -0,0 +1,662 @@
+import math
+import numpy
+import contextlib
+import multiprocessing
+import multiprocessing.sharedctypes
+from collections import OrderedDict
+
+try:
+	from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+	shared_memory = None
+	
+# Blender-free geometry kernels of the plane sectionalizer, working on numpy arrays
+
+VERTICES_MAX = 4095
+
+CACHE_SIZE = 16
+
+WELD_DIRECTION = numpy.array([1.0, 0.41421356, 0.73205081]) / numpy.linalg.norm([1.0, 0.41421356, 0.73205081])
+
+NEIGHBOURS = [(-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1)]
+
+# grid utils
+
+def grid_layout(dimensions, by_number, number, size, number_mode):
+	if by_number:
+		numb = [number[0], number[1]]
+		size = [dimensions[0] / numb[0], dimensions[1] / numb[1]]
+	else:
+		size = [size[0], size[1]]
+		n_x = math.ceil(dimensions[0] / size[0])
+		n_y = math.ceil(dimensions[1] / size[1])
+		if number_mode == "use_automatic_numbering":
+			numb = [n_x, n_y]
+		else:
+			i = 0 if number_mode == "use_even_numbers" else 1
+			numb = [n_x + 1 - i if n_x % 2 else n_x + i, n_y + 1 - i if n_y % 2 else n_y + i]
+	return numb, size
+	
+def grid_offset(center, size):
+	return [int(center[0] / size[0]) * size[0], int(center[1] / size[1]) * size[1]]
+	
+class Grid:
+	
+	# Cells of a grid centered on the origin, extended by one cell on the side the plane is
+	# off-center (loc); cell i spans [boundary(i - 1), boundary(i)] for start <= i < end.
+	
+	def __init__(self, numb, size, loc):
+		self.numb = [int(numb[0]), int(numb[1])]
+		self.size = [size[0], size[1]]
+		dirs = [int(numpy.sign(int(loc[0]))), int(numpy.sign(int(loc[1])))]
+		self.start = [0 if d < 0 else 1 for d in dirs]
+		self.end = [n + abs(d) + 1 for n, d in zip(self.numb, dirs)]
+		self.shape = (self.end[1] - self.start[1], self.end[0] - self.start[0])
+		
+	def boundary(self, axis, i):
+		return (i - 0.5 * self.numb[axis]) * self.size[axis]
+		
+	def locations(self):
+		return [(self.boundary(0, i) - self.size[0] * 0.5, self.boundary(1, j) - self.size[1] * 0.5) for j in range(self.start[1], self.end[1]) for i in range(self.start[0], self.end[0])]
+		
+	def cells(self, xy):
+		ij = numpy.empty(xy.shape, numpy.int64)
+		for axis in (0, 1):
+			i = numpy.floor(xy[..., axis] / self.size[axis] + 0.5 * self.numb[axis]).astype(numpy.int64) + 1 - self.start[axis]
+			ij[..., axis] = numpy.clip(i, 0, self.shape[1 - axis] - 1)
+		return ij
+		
+	def cell_pairs(self, lo, hi):
+		
+		# Expands the cell ranges [lo, hi] of n triangles into (triangle, cell) pairs.
+		
+		span = hi - lo + 1
+		n = span[:, 0] * span[:, 1]
+		tri = numpy.repeat(numpy.arange(len(lo)), n)
+		k = numpy.arange(len(tri)) - numpy.repeat(numpy.cumsum(n) - n, n)
+		w = span[tri, 0]
+		return tri, (lo[tri, 1] + k // w) * self.shape[1] + lo[tri, 0] + k % w
+		
+# mesh utils
+
+def triangulate(loop_start, loop_total):
+	n_tris = numpy.maximum(loop_total - 2, 0)
+	tri_poly = numpy.repeat(numpy.arange(len(loop_start)), n_tris)
+	first = numpy.repeat(loop_start, n_tris)
+	fan = numpy.arange(len(tri_poly)) - numpy.repeat(numpy.cumsum(n_tris) - n_tris, n_tris)
+	tri_loops = numpy.column_stack((first, first + fan + 1, first + fan + 2))
+	return tri_loops, tri_poly
+	
+def unique_rows(keys):
+	order = numpy.lexsort(keys.T[::-1])
+	first = numpy.ones(len(order), bool)
+	first[1:] = (keys[order][1:] != keys[order][:-1]).any(axis=1)
+	inverse = numpy.empty(len(order), numpy.int64)
+	inverse[order] = numpy.cumsum(first) - 1
+	return order[first], inverse
+	
+def weld(co, tris, tolerance):
+	
+	# Like remove_doubles, vertices closer than tolerance are merged (into the first of them,
+	# and transitively): sorted along a direction no grid is aligned to, each vertex is only
+	# compared with the following ones less than tolerance further along it.
+	
+	proj = numpy.dot(co, WELD_DIRECTION)
+	order = numpy.argsort(proj, kind="mergesort")
+	proj, sorted_co = proj[order], co[order]
+	pairs = []
+	active = numpy.arange(len(co) - 1)
+	k = 1
+	while len(active):
+		active = active[proj[active + k] - proj[active] <= tolerance]
+		near = numpy.einsum("ij,ij->i", sorted_co[active + k] - sorted_co[active], sorted_co[active + k] - sorted_co[active]) <= tolerance * tolerance
+		pairs.append((order[active[near]], order[active[near] + k]))
+		k += 1
+		active = active[active + k < len(co)]
+	remap = numpy.arange(len(co))
+	if pairs:
+		i = numpy.concatenate([a for a, b in pairs])
+		j = numpy.concatenate([b for a, b in pairs])
+		while True:
+			low = numpy.minimum(remap[i], remap[j])
+			new = remap.copy()
+			numpy.minimum.at(new, i, low)
+			numpy.minimum.at(new, j, low)
+			new = new[new]
+			if (new == remap).all():
+				break
+			remap = new
+	index, inverse = unique_rows(remap[:, None])
+	tris = inverse[tris]
+	keep = (tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 2] != tris[:, 0])
+	return co[remap[index]], tris[keep], keep
+	
+def merge_blocks(m_verts, keys):
+	
+	# Merges the vertex blocks of materials sharing a key into the block of the first of them;
+	# returns the blocks and, per merged block, its materials and the layer (index into these
+	# materials) of each vertex.
+	
+	groups = OrderedDict()
+	for m, key in zip(m_verts, keys):
+		groups.setdefault(key, []).append(m)
+	blocks = OrderedDict()
+	layers = OrderedDict()
+	for mats in groups.values():
+		blocks[mats[0]] = numpy.concatenate([m_verts[m] for m in mats])
+		if len(mats) > 1:
+			layers[mats[0]] = (mats, numpy.repeat(numpy.arange(len(mats)), [len(m_verts[m]) for m in mats]))
+	return blocks, layers
+	
+# vertex cache
+
+def acmr(tris, cache_size=CACHE_SIZE):
+	
+	# Average cache miss ratio of drawing tris through a FIFO post-transform cache.
+	
+	cache = []
+	cached = set()
+	misses = 0
+	for v in tris.ravel().tolist():
+		if v not in cached:
+			misses += 1
+			cache.append(v)
+			cached.add(v)
+			if len(cache) > cache_size:
+				cached.discard(cache.pop(0))
+	return misses / max(len(tris), 1)
+	
+def tipsify(tris, cache_size=CACHE_SIZE):
+	
+	# Triangle order for vertex cache locality (Sander, Nehab and Barczak, 2007): the triangles
+	# of a fanning vertex are emitted together, the next fanning vertex being the one still in
+	# the cache, with triangles left, that entered it first.
+	
+	n = int(tris.max()) + 1 if len(tris) else 0
+	flat = tris.ravel()
+	order = numpy.argsort(flat, kind="mergesort")
+	starts = numpy.searchsorted(flat[order], numpy.arange(n + 1)).tolist()
+	adjacency = (order // 3).tolist()
+	tris_list = tris.tolist()
+	live = numpy.bincount(flat, minlength=n).tolist()
+	stamps = [0] * n
+	emitted = [False] * len(tris)
+	dead_end = []
+	out = []
+	time = cache_size + 1
+	cursor = 0
+	f = 0 if n else -1
+	while f >= 0:
+		candidates = []
+		for t in adjacency[starts[f]:starts[f + 1]]:
+			if not emitted[t]:
+				emitted[t] = True
+				out.append(t)
+				for v in tris_list[t]:
+					dead_end.append(v)
+					candidates.append(v)
+					live[v] -= 1
+					if time - stamps[v] > cache_size:
+						stamps[v] = time
+						time += 1
+		f = -1
+		best = -1
+		for v in candidates:
+			if live[v] > 0:
+				priority = time - stamps[v] if time - stamps[v] + 2 * live[v] <= cache_size else 0
+				if priority > best:
+					f, best = v, priority
+		while f < 0 and dead_end:
+			v = dead_end.pop()
+			if live[v] > 0:
+				f = v
+		while f < 0 and cursor < n:
+			if live[cursor] > 0:
+				f = cursor
+			cursor += 1
+	return numpy.array(out, numpy.int64)
+	
+def reorder_indexed(positions, tris, cache_size=CACHE_SIZE):
+	
+	# Triangles in tipsify order, unless that misses the cache more than their order, then
+	# vertices in order of first use for fetch locality.
+	
+	order = tipsify(tris, cache_size)
+	if acmr(tris[order], cache_size) < acmr(tris, cache_size):
+		tris = tris[order]
+	first = numpy.unique(tris.ravel(), return_index=True)[1]
+	used = tris.ravel()[numpy.sort(first)]
+	remap = numpy.empty(len(positions), numpy.int64)
+	remap[used] = numpy.arange(len(used))
+	return positions[used], remap[tris]
+	
+def reorder_flat(verts, cache_size=CACHE_SIZE):
+	
+	# Flat BDX vertices (n, 8) with their triangles in tipsify order, the cache being that of
+	# drawing them indexed (identical vertices shared); returns them with the ACMR before and
+	# after. Their order is kept if tipsify does not improve on it (small blocks).
+	
+	index, inverse = unique_rows(numpy.ascontiguousarray(verts).view(numpy.int32).reshape(len(verts), -1))
+	tris = inverse.reshape(-1, 3)
+	order = tipsify(tris, cache_size)
+	before, after = acmr(tris, cache_size), acmr(tris[order], cache_size)
+	if after >= before:
+		return verts, before, before
+	return verts.reshape(-1, 3, verts.shape[1])[order].reshape(-1, verts.shape[1]), before, after
+	
+# section metadata
+
+def cell_indices(positions, offset, size):
+	return numpy.rint((numpy.asarray(positions)[:, :2] - offset[:2]) / size[:2]).astype(numpy.int64)
+	
+def coarsen(cells, factor, size):
+	
+	# Cells of a grid factor times coarser, whose boundaries are boundaries of the cells: the
+	# coarse cells in order of first appearance, the coarse cell of each cell and the offset of
+	# its center from the coarse cell's center.
+	
+	cells = numpy.asarray(cells, numpy.int64).reshape(-1, 2)
+	parents = cells // factor
+	index, inverse = unique_rows(parents)
+	order = numpy.argsort(index)
+	rank = numpy.empty_like(order)
+	rank[order] = numpy.arange(len(order))
+	shift = (cells - parents * factor - (factor - 1) * 0.5) * numpy.asarray(size[:2], numpy.float64)
+	return parents[index[order]], rank[inverse], shift
+	
+def neighbours(cells):
+	index = {(int(i), int(j)): k for k, (i, j) in enumerate(cells)}
+	return [[index.get((int(i) + di, int(j) + dj)) for di, dj in NEIGHBOURS] for i, j in cells]
+	
+def horizon(co, size, tolerance):
+	
+	# Conservative occluder height of each cell edge (W, E, S, N): the lowest vertex on the
+	# edge, or None if the vertices on it do not reach both ends of the edge.
+	
+	heights = []
+	for axis, side in ((0, -1), (0, 1), (1, -1), (1, 1)):
+		on = numpy.abs(co[:, axis] - side * size[axis] * 0.5) <= tolerance
+		along = co[on, 1 - axis]
+		half = size[1 - axis] * 0.5
+		if len(along) and along.min() <= tolerance - half and along.max() >= half - tolerance:
+			heights.append(float(co[on, 2].min()))
+		else:
+			heights.append(None)
+	return heights
+	
+# collision
+
+def collision_mesh(co, tris, size, tolerance, eps=0.0001):
+	
+	# Vertex clustering on a 3D grid whose cubes have a diagonal of tolerance, the cluster
+	# positions being the means of their vertices, so no vertex moves further than tolerance
+	# (steep slopes included); vertices on the cell edges are only welded, so seams stay
+	# crack-free.
+	
+	half = numpy.array(size[:2]) * 0.5
+	seam = (numpy.abs(numpy.abs(co[:, :2]) - half) <= eps).any(axis=1)
+	keys = numpy.zeros((len(co), 4), numpy.int64)
+	keys[:, :3] = numpy.floor((co - (-half[0], -half[1], 0)) / (tolerance / math.sqrt(3)))
+	keys[seam, :3] = numpy.rint(co[seam] / eps)
+	keys[seam, 3] = 1
+	index, inverse = unique_rows(keys)
+	n = numpy.bincount(inverse, minlength=len(index))
+	positions = numpy.column_stack([numpy.bincount(inverse, co[:, axis], len(index)) / n for axis in range(3)])
+	tris = inverse[tris]
+	tris = tris[(tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 2] != tris[:, 0])]
+	first, _ = unique_rows(numpy.sort(tris, axis=1))
+	tris = tris[numpy.sort(first)]
+	used, tris = numpy.unique(tris, return_inverse=True)
+	return positions[used], tris.reshape(-1, 3)
+	
+def lattice_heights(v, e1, e2, cross, facing, size, nodes):
+	
+	# Heights of the upward facing triangles facing at the nodes of a lattice spanning the
+	# cell, None if a node is not covered. Nodes on the cell edges are sampled a hair inside,
+	# where float32 positions surely cover them.
+	
+	steps = numpy.array(size[:2]) / (nodes - 1)
+	half = numpy.array(size[:2]) * 0.5
+	xy = v[facing, :, :2] + half
+	lo = numpy.clip(numpy.ceil(xy.min(axis=1) / steps - 1e-6), 0, nodes - 1).astype(numpy.int64)
+	hi = numpy.clip(numpy.floor(xy.max(axis=1) / steps + 1e-6), 0, nodes - 1).astype(numpy.int64)
+	span = numpy.maximum(hi - lo + 1, 0)
+	count = span[:, 0] * span[:, 1]
+	t = numpy.repeat(numpy.arange(len(facing)), count)
+	k = numpy.arange(len(t)) - numpy.repeat(numpy.cumsum(count) - count, count)
+	i = lo[t, 0] + k % span[t, 0]
+	j = lo[t, 1] + k // span[t, 0]
+	
+	p = numpy.clip(numpy.column_stack((i, j)) * steps - half, 1e-4 * steps - half, half - 1e-4 * steps)
+	a = v[facing[t], 0]
+	d = p - a[:, :2]
+	w1 = (d[:, 0] * e2[facing[t], 1] - d[:, 1] * e2[facing[t], 0]) / cross[facing[t]]
+	w2 = (e1[facing[t], 0] * d[:, 1] - e1[facing[t], 1] * d[:, 0]) / cross[facing[t]]
+	inside = (w1 >= -1e-6) & (w2 >= -1e-6) & (w1 + w2 <= 1 + 1e-6)
+	z = a[:, 2] + w1 * (v[facing[t], 1, 2] - a[:, 2]) + w2 * (v[facing[t], 2, 2] - a[:, 2])
+	
+	heights = numpy.full((nodes[1], nodes[0]), numpy.nan)
+	heights[j[inside], i[inside]] = z[inside]
+	if numpy.isnan(heights).any():
+		return None
+	return heights
+	
+def bilinear(heights, size, xy):
+	nodes = numpy.array([heights.shape[1], heights.shape[0]])
+	g = (xy + numpy.array(size[:2]) * 0.5) / (numpy.array(size[:2]) / (nodes - 1))
+	i = numpy.clip(numpy.floor(g), 0, nodes - 2).astype(numpy.int64)
+	f = g - i
+	h00 = heights[i[:, 1], i[:, 0]]
+	h10 = heights[i[:, 1], i[:, 0] + 1]
+	h01 = heights[i[:, 1] + 1, i[:, 0]]
+	h11 = heights[i[:, 1] + 1, i[:, 0] + 1]
+	return (h00 * (1 - f[:, 0]) + h10 * f[:, 0]) * (1 - f[:, 1]) + (h01 * (1 - f[:, 0]) + h11 * f[:, 0]) * f[:, 1]
+	
+def heightfield(co, tris, size, tolerance):
+	
+	# Heights at the nodes of the coarsest lattice (doubling its resolution) whose bilinear
+	# interpolation is within tolerance of the section's vertices, if the triangles cover the
+	# cell exactly once seen from above and such a lattice has fewer nodes than the section
+	# has vertices; None otherwise.
+	
+	v = co[tris]
+	e1 = v[:, 1, :2] - v[:, 0, :2]
+	e2 = v[:, 2, :2] - v[:, 0, :2]
+	cross = e1[:, 0] * e2[:, 1] - e1[:, 1] * e2[:, 0]
+	cell_area = size[0] * size[1]
+	if (cross < -1e-6 * cell_area).any() or abs(cross.sum() * 0.5 - cell_area) > 1e-3 * cell_area:
+		return None
+		
+	facing = numpy.flatnonzero(cross > 1e-9 * cell_area)
+	vertices = co[unique_rows(co)[0]]
+	longest = max(size[0], size[1])
+	resolution = 1
+	while True:
+		nodes = numpy.array([max(int(round(resolution * size[axis] / longest)), 1) + 1 for axis in (0, 1)])
+		if nodes[0] * nodes[1] > len(vertices):
+			return None
+		heights = lattice_heights(v, e1, e2, cross, facing, size, nodes)
+		if heights is None:
+			return None
+		if numpy.abs(bilinear(heights, size, vertices[:, :2]) - vertices[:, 2]).max() <= tolerance:
+			return heights
+		resolution *= 2
+		
+def collision(co, size, tolerance):
+	
+	# Simplified, position only collision data of a section from its triangle corners, as
+	# (heights, positions, indices): a heightfield when the section is grid-like (a single
+	# valued surface), an indexed mesh otherwise.
+	
+	tris = numpy.arange(len(co)).reshape(-1, 3)
+	heights = heightfield(co, tris, size, tolerance)
+	if heights is not None:
+		return heights, None, None
+	return (None,) + collision_mesh(co, tris, size, tolerance)
+	
+# estimation
+
+class Estimate:
+	
+	def __init__(self, counts, materials, grid):
+		self.counts = counts
+		self.materials = materials
+		self.grid = grid
+		occupied = counts.sum(axis=0) > 0
+		self.sections = int(occupied.sum())
+		self.empty = int(occupied.size - self.sections)
+		self.vertices_max = int(counts.max()) * 3 if counts.size else 0
+		
+	def worst(self, n=3):
+		order = numpy.argsort(self.counts, axis=None)[::-1][:n]
+		worst = []
+		for m, j, i in zip(*numpy.unravel_index(order, self.counts.shape)):
+			if self.counts[m, j, i]:
+				worst.append(((int(i), int(j)), self.materials[m], int(self.counts[m, j, i]) * 3))
+		return worst
+		
+def estimate(co, tris, tri_mat, materials, grid):
+	
+	# Triangles inside one cell count once, triangles straddling cells are counted in every
+	# cell their bounds overlap, as the quad left after clipping them (2 triangles).
+	
+	tri_co = co[tris][..., :2]
+	lo = grid.cells(tri_co.min(axis=1))
+	hi = grid.cells(tri_co.max(axis=1))
+	n_cells = grid.shape[0] * grid.shape[1]
+	
+	inside = (lo == hi).all(axis=1)
+	
+	keys = [tri_mat[inside] * n_cells + lo[inside, 1] * grid.shape[1] + lo[inside, 0]]
+	weights = [numpy.ones(keys[0].shape)]
+	
+	straddling = numpy.flatnonzero(~inside)
+	if len(straddling):
+		t, cell = grid.cell_pairs(lo[straddling], hi[straddling])
+		keys.append(tri_mat[straddling[t]] * n_cells + cell)
+		weights.append(numpy.full(len(t), 2.0))
+		
+	counts = numpy.bincount(numpy.concatenate(keys), numpy.concatenate(weights), len(materials) * n_cells)
+	return Estimate(counts.reshape((len(materials),) + grid.shape), materials, grid)
+	
+# clipping
+
+def clip_polygons(polys, counts, axis, value, sign):
+	
+	# Sutherland-Hodgman on n polygons at once, keeping sign * (p[axis] - value) <= 0; only
+	# the polygons crossing the plane are clipped, the others are kept or emptied whole.
+	# Crossing edges are interpolated from their lower end on axis, so both cells
+	# sharing a cut compute bitwise identical seam vertices.
+	
+	n, k, a = polys.shape
+	valid = numpy.arange(k)[None, :] < counts[:, None]
+	inside = sign * (polys[..., axis] - value) <= 0
+	n_in = (valid & inside).sum(axis=1)
+	counts = numpy.where(n_in, counts, 0)
+	partial = numpy.flatnonzero(n_in < counts)
+	if not len(partial):
+		return polys, counts
+		
+	value = numpy.broadcast_to(value, (n, 1))[partial]
+	p0 = polys[partial]
+	valid = valid[partial]
+	rows = numpy.arange(len(partial))[:, None]
+	idx = numpy.arange(k)[None, :]
+	p1 = p0[rows, numpy.where(idx + 1 < counts[partial, None], idx + 1, 0)]
+	in0 = inside[partial]
+	in1 = sign * (p1[..., axis] - value) <= 0
+	cross = valid & (in0 != in1)
+	swap = (p0[..., axis] > p1[..., axis])[..., None]
+	lo = numpy.where(swap, p1, p0)
+	hi = numpy.where(swap, p0, p1)
+	with numpy.errstate(divide="ignore", invalid="ignore"):
+		t = numpy.where(cross, (value - lo[..., axis]) / (hi[..., axis] - lo[..., axis]), 0)
+	x = lo + t[..., None] * (hi - lo)
+	x[..., axis] = value
+	out = numpy.stack((p0, x), axis=2).reshape(len(partial), 2 * k, a)
+	mask = numpy.stack((valid & in0, cross), axis=2).reshape(len(partial), 2 * k)
+	out = out[rows, numpy.argsort(~mask, axis=1, kind="mergesort")]
+	counts[partial] = mask.sum(axis=1)
+	
+	polys = numpy.concatenate((polys, numpy.zeros((n, k, a), polys.dtype)), axis=1)
+	polys[partial] = out
+	return polys[:, :max(counts.max(), 1)], counts
+	
+def fan(polys, counts):
+	n_tris = numpy.maximum(counts - 2, 0)
+	poly = numpy.repeat(numpy.arange(len(polys)), n_tris)
+	k = numpy.arange(len(poly)) - numpy.repeat(numpy.cumsum(n_tris) - n_tris, n_tris)
+	return numpy.stack((polys[poly, 0], polys[poly, k + 1], polys[poly, k + 2]), axis=1), poly
+	
+def clip_chunk(arrays, grid, tolerance, start, stop):
+	
+	# Clips the (triangle, cell) pairs start:stop, sorted by cell, to their cells, and
+	# normalizes the interpolated normals. Returns (cell, material, vertices) per non-empty
+	# cell and material, vertices being corners (position relative to the cell center, normal,
+	# uv) flattened per triangle; triangles of zero area, or collapsed by welding the vertices
+	# of their cell and material, are dropped.
+	
+	tri = arrays["pair_tri"][start:stop]
+	cell = arrays["pair_cell"][start:stop]
+	polys = numpy.array(arrays["corners"][tri], numpy.float64)
+	counts = numpy.full(len(tri), 3)
+	
+	col = cell % grid.shape[1] + grid.start[0]
+	row = cell // grid.shape[1] + grid.start[1]
+	polys, counts = clip_polygons(polys, counts, 0, grid.boundary(0, col - 1)[:, None], -1)
+	polys, counts = clip_polygons(polys, counts, 0, grid.boundary(0, col)[:, None], 1)
+	polys, counts = clip_polygons(polys, counts, 1, grid.boundary(1, row - 1)[:, None], -1)
+	polys, counts = clip_polygons(polys, counts, 1, grid.boundary(1, row)[:, None], 1)
+	
+	tris, poly = fan(polys, counts)
+	keep = numpy.cross(tris[:, 1, :3] - tris[:, 0, :3], tris[:, 2, :3] - tris[:, 0, :3]).any(axis=1)
+	tris, poly = tris[keep], poly[keep]
+	
+	tris[..., 0] -= grid.boundary(0, col[poly] - 0.5)[:, None]
+	tris[..., 1] -= grid.boundary(1, row[poly] - 0.5)[:, None]
+	tris[..., 3:6] /= numpy.maximum(numpy.linalg.norm(tris[..., 3:6], axis=2), 1e-12)[..., None]
+	
+	mat = arrays["tri_mat"][tri[poly]]
+	key = cell[poly] * (int(mat.max()) + 1 if len(mat) else 1) + mat
+	order = numpy.argsort(key, kind="mergesort")
+	tris, key, cell, mat = tris[order], key[order], cell[poly][order], mat[order]
+	splits = numpy.flatnonzero(numpy.diff(key)) + 1
+	results = []
+	for t, c, m in zip(numpy.split(tris, splits), cell[numpy.r_[0, splits]] if len(key) else [], mat[numpy.r_[0, splits]] if len(key) else []):
+		t = t[weld(t[..., :3].reshape(-1, 3), numpy.arange(3 * len(t)).reshape(-1, 3), tolerance)[2]]
+		if len(t):
+			results.append((int(c), int(m), t.reshape(-1, t.shape[-1]).astype(numpy.float32)))
+	return results
+	
+# shared memory workers
+
+class SharedArrays:
+	
+	# Copies arrays once into shared memory (multiprocessing.shared_memory if available,
+	# sharedctypes otherwise); workers attach to them by the picklable specs.
+	
+	def __init__(self, arrays):
+		self.blocks = []
+		self.specs = {}
+		for name, a in arrays.items():
+			a = numpy.ascontiguousarray(a)
+			if shared_memory:
+				shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+				self.blocks.append(shm)
+				buf = shm.name
+				view = numpy.ndarray(a.shape, a.dtype, buffer=shm.buf)
+			else:
+				buf = multiprocessing.sharedctypes.RawArray("b", max(a.nbytes, 1))
+				view = numpy.frombuffer(buf, a.dtype, a.size).reshape(a.shape)
+			view[...] = a
+			del view
+			self.specs[name] = (buf, a.shape, a.dtype.str)
+			
+	def close(self):
+		for shm in self.blocks:
+			shm.close()
+			shm.unlink()
+			
+def attach(specs):
+	arrays = {}
+	blocks = []
+	for name, (buf, shape, dtype) in specs.items():
+		if shared_memory:
+			shm = shared_memory.SharedMemory(name=buf)
+			blocks.append(shm)
+			buf = shm.buf
+		arrays[name] = numpy.frombuffer(buf, dtype, int(numpy.prod(shape))).reshape(shape)
+	return arrays, blocks
+	
+worker = {}
+
+def worker_init(specs, grid, tolerance):
+	worker["arrays"], worker["blocks"] = attach(specs)
+	worker["grid"] = grid
+	worker["tolerance"] = tolerance
+	
+def worker_clip(chunk):
+	return clip_chunk(worker["arrays"], worker["grid"], worker["tolerance"], *chunk)
+	
+def worker_clip_call(task):
+	
+	# For a pool reused across sectionalize calls: the arrays of a call are attached at its
+	# first chunk, those of the previous call released.
+	
+	specs, grid, tolerance, start, stop = task
+	if worker.get("specs") != specs:
+		worker["arrays"] = None
+		for shm in worker.get("blocks", []):
+			shm.close()
+		worker_init(specs, grid, tolerance)
+		worker["specs"] = specs
+	return clip_chunk(worker["arrays"], grid, tolerance, start, stop)
+	
+@contextlib.contextmanager
+def pool(workers):
+	
+	# A pool of worker processes for sectionalize to reuse across calls, None if running
+	# workers can not attach to new arrays (no multiprocessing.shared_memory) or fork is not
+	# available; sectionalize then forks its own workers per call, if any.
+	
+	if workers < 2 or not shared_memory or "fork" not in multiprocessing.get_all_start_methods():
+		yield None
+		return
+		
+	# forked with the resource tracker running, the workers share it, instead of starting
+	# their own that would unlink the shared memory of every call again at exit
+	
+	resource_tracker.ensure_running()
+	workers_pool = multiprocessing.get_context("fork").Pool(workers)
+	try:
+		yield workers_pool
+	finally:
+		workers_pool.terminate()
+		workers_pool.join()
+		
+def sectionalize(corners, tri_mat, grid, workers=1, tolerance=0.0001, pool=None):
+	
+	# Generator clipping triangle corners (n, 3, attributes) to the grid cells, yielding
+	# (chunks done, chunks) and returning the results of clip_chunk for all cells, in cell
+	# order. Chunks hold whole cells, so results do not depend on the number of workers.
+	# Given a pool (see pool), its workers are used instead of forking new ones.
+	
+	xy = corners[:, :, :2]
+	tri, cell = grid.cell_pairs(grid.cells(xy.min(axis=1)), grid.cells(xy.max(axis=1)))
+	order = numpy.argsort(cell, kind="mergesort")
+	arrays = {"corners": corners, "tri_mat": tri_mat, "pair_tri": tri[order], "pair_cell": cell[order]}
+	
+	n_pairs = len(order)
+	cell_starts = numpy.searchsorted(arrays["pair_cell"], numpy.arange(grid.shape[0] * grid.shape[1] + 1))
+	targets = numpy.linspace(0, n_pairs, max(workers * 4, 16) + 1)
+	edges = numpy.unique(numpy.r_[0, cell_starts[numpy.minimum(numpy.searchsorted(cell_starts, targets), len(cell_starts) - 1)], n_pairs])
+	chunks = [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+	
+	results = []
+	if pool is not None and len(chunks) > 1:
+		shared = SharedArrays(arrays)
+		try:
+			for k, result in enumerate(pool.imap(worker_clip_call, [(shared.specs, grid, tolerance) + chunk for chunk in chunks])):
+				results += result
+				yield k + 1, len(chunks)
+		finally:
+			shared.close()
+	elif workers > 1 and len(chunks) > 1 and "fork" in multiprocessing.get_all_start_methods():
+		shared = SharedArrays(arrays)
+		try:
+			pool = multiprocessing.get_context("fork").Pool(min(workers, len(chunks)), worker_init, (shared.specs, grid, tolerance))
+			try:
+				for k, result in enumerate(pool.imap(worker_clip, chunks)):
+					results += result
+					yield k + 1, len(chunks)
+			finally:
+				pool.terminate()
+				pool.join()
+		finally:
+			shared.close()
+	else:
+		for k, chunk in enumerate(chunks):
+			results += clip_chunk(arrays, grid, tolerance, *chunk)
+			yield k + 1, len(chunks)
+	return results
+	
\ No newline at end of file
@@ -0,0 +1,398 @@
+import os
+import sys
+import argparse
+import tempfile
+import numpy
+from collections import OrderedDict
+
+try:
+	from . import sections as se
+	from . import sctx
+except ImportError:
+	import sections as se
+	import sctx
+	
+# Blender-free sectionalizing of PLY and OBJ files: triangles are streamed a chunk at a time
+# from the file into per cell buckets on disk, from which the .sctx file is written a section
+# at a time, so meshes larger than memory can be sectionalized:
+#
+#	python streaming.py terrain.ply ASSETS/sections/Terrain.sctx --size 16 16
+
+CHUNK = 1 << 18
+
+WELD_TOLERANCE = 0.0001
+
+PLY_TYPES = {
+	"char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+	"short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+	"int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+	"float": "f4", "float32": "f4", "double": "f8", "float64": "f8"
+}
+
+PLY_UVS = [("u", "v"), ("s", "t"), ("texture_u", "texture_v")]
+
+# meshes
+
+class PlyMesh:
+	
+	# Vertices and faces of a PLY file; binary files are memory mapped, ascii files are read
+	# into memory. All faces must have the same number of vertices.
+	
+	def __init__(self, file_path):
+		self.materials = [sctx.DEFAULT_MATERIAL]
+		with open(file_path, "rb") as f:
+			if f.readline().strip() != b"ply":
+				raise ValueError("not a PLY file: " + file_path)
+			elements = []
+			while True:
+				words = f.readline().decode("ascii").split()
+				if not words or words[0] == "comment":
+					continue
+				if words[0] == "format":
+					fmt = words[1]
+				elif words[0] == "element":
+					elements.append((words[1], int(words[2]), []))
+				elif words[0] == "property":
+					elements[-1][2].append(words[1:])
+				elif words[0] == "end_header":
+					break
+			header_length = f.tell()
+			
+			endian = {"binary_little_endian": "<", "binary_big_endian": ">"}.get(fmt)
+			offset = header_length
+			for name, count, props in elements:
+				if endian:
+					dtype = self.dtype(props, endian, f, offset)
+					data = numpy.memmap(file_path, dtype, "r", offset, (count,))
+					offset += dtype.itemsize * count
+				else:
+					data = self.ascii(f, props, count)
+				if name == "vertex":
+					self.vertices = data
+				elif name == "face":
+					self.faces = data
+					
+		names = self.vertices.dtype.names
+		self.normals = ("nx", "ny", "nz") if "nx" in names else None
+		self.uvs = next((uv for uv in PLY_UVS if uv[0] in names), None)
+		
+	def dtype(self, props, endian, f, offset):
+		fields = []
+		for prop in props:
+			if prop[0] == "list":
+				f.seek(offset + numpy.dtype(fields).itemsize)
+				n = int(numpy.frombuffer(f.read(numpy.dtype(PLY_TYPES[prop[1]]).itemsize), endian + PLY_TYPES[prop[1]])[0])
+				fields.append((prop[3] + "_count", endian + PLY_TYPES[prop[1]]))
+				fields.append((prop[3], endian + PLY_TYPES[prop[2]], (n,)))
+			else:
+				fields.append((prop[1], endian + PLY_TYPES[prop[0]]))
+		return numpy.dtype(fields)
+		
+	def ascii(self, f, props, count):
+		rows = [f.readline().split() for i in range(count)]
+		fields = []
+		columns = []
+		k = 0
+		for prop in props:
+			if prop[0] == "list":
+				n = int(rows[0][k]) if rows else 3
+				fields += [(prop[3] + "_count", PLY_TYPES[prop[1]]), (prop[3], PLY_TYPES[prop[2]], (n,))]
+				columns += [k, slice(k + 1, k + 1 + n)]
+				k += 1 + n
+			else:
+				fields.append((prop[1], PLY_TYPES[prop[0]]))
+				columns.append(k)
+				k += 1
+		data = numpy.zeros(count, fields)
+		table = numpy.array(rows, float) if rows else numpy.zeros((0, k))
+		for field, column in zip(fields, columns):
+			data[field[0]] = table[:, column]
+		return data
+		
+	def triangles(self, chunk=CHUNK):
+		field = "vertex_indices" if "vertex_indices" in self.faces.dtype.names else "vertex_index"
+		for start in range(0, len(self.faces), chunk):
+			faces = self.faces[start:start + chunk]
+			for name in faces.dtype.names:
+				if name + "_count" in faces.dtype.names and (faces[name + "_count"] != faces.dtype[name].shape[0]).any():
+					raise ValueError("PLY faces with different numbers of vertices (or " + name + ") are not supported, triangulate first")
+			polys = numpy.asarray(faces[field], numpy.int64)
+			n = polys.shape[1]
+			tris = numpy.stack([polys[:, [0, k + 1, k + 2]] for k in range(n - 2)], axis=1).reshape(-1, 3)
+			yield tris, numpy.zeros(len(tris), numpy.int64)
+			
+	def positions(self, start=0, stop=None):
+		v = self.vertices[start:stop]
+		return numpy.column_stack((v["x"], v["y"], v["z"])).astype(numpy.float64)
+		
+	def triangle_positions(self, tris):
+		v = self.vertices[tris.ravel()]
+		return numpy.column_stack((v["x"], v["y"], v["z"])).astype(numpy.float64).reshape(-1, 3, 3)
+		
+	def corners(self, vertex_normals, chunk=CHUNK):
+		
+		# Triangle corners (n, 3, 8): position, normal, uv.
+		
+		for tris, tri_mat in self.triangles(chunk):
+			v = self.vertices[tris.ravel()]
+			corners = numpy.zeros((len(v), 8))
+			corners[:, 0:3] = numpy.column_stack((v["x"], v["y"], v["z"]))
+			corners[:, 3:6] = numpy.column_stack([v[n] for n in self.normals]) if self.normals else vertex_normals[tris.ravel()]
+			if self.uvs:
+				corners[:, 6:8] = numpy.column_stack([v[n] for n in self.uvs])
+			yield corners.reshape(-1, 3, 8), tri_mat
+			
+	def __len__(self):
+		return len(self.vertices)
+		
+class ObjMesh:
+	
+	# Positions, uvs and normals of an OBJ file are read into memory in a first pass, faces
+	# are streamed in chunks of lines; polygons are fan triangulated.
+	
+	def __init__(self, file_path):
+		self.file_path = file_path
+		self.materials = []
+		lists = {"v": [], "vt": [], "vn": []}
+		with open(file_path) as f:
+			while True:
+				lines = f.readlines(CHUNK * 32)
+				if not lines:
+					break
+				for key, rows in lists.items():
+					prefix = key + " "
+					values = [l.split()[1:4] for l in lines if l.startswith(prefix)]
+					if values:
+						rows.append(numpy.array([v + ["0"] * (3 - len(v)) for v in values], float))
+				for l in lines:
+					if l.startswith("usemtl "):
+						name = l.split(None, 1)[1].strip()
+						if name not in self.materials:
+							self.materials.append(name)
+		self.co, self.uv, self.no = [numpy.concatenate(lists[k]) if lists[k] else numpy.zeros((0, 3)) for k in ("v", "vt", "vn")]
+		self.normals = len(self.no) > 0
+		self.materials = self.materials or [sctx.DEFAULT_MATERIAL]
+		
+	def faces(self, chunk=CHUNK):
+		
+		# Yields per chunk the (n, 3, 3) position, uv and normal indices of the triangles
+		# (-1 if missing) and their materials.
+		
+		mat = 0
+		n = {"v": 0, "vt": 0, "vn": 0}
+		with open(self.file_path) as f:
+			while True:
+				lines = f.readlines(chunk * 32)
+				if not lines:
+					break
+				corners = []
+				mats = []
+				for l in lines:
+					if l.startswith("f "):
+						poly = []
+						for word in l.split()[1:]:
+							ids = (word.split("/") + ["", ""])[:3]
+							corner = []
+							for i, key in zip(ids, ("v", "vt", "vn")):
+								i = int(i) if i else 0
+								corner.append(i - 1 if i > 0 else n[key] + i if i < 0 else -1)
+							poly.append(corner)
+						for k in range(1, len(poly) - 1):
+							corners.append((poly[0], poly[k], poly[k + 1]))
+							mats.append(mat)
+					elif l.startswith("v "):
+						n["v"] += 1
+					elif l.startswith("vt "):
+						n["vt"] += 1
+					elif l.startswith("vn "):
+						n["vn"] += 1
+					elif l.startswith("usemtl "):
+						mat = self.materials.index(l.split(None, 1)[1].strip())
+				if corners:
+					yield numpy.array(corners, numpy.int64), numpy.array(mats, numpy.int64)
+					
+	def triangles(self, chunk=CHUNK):
+		for ids, tri_mat in self.faces(chunk):
+			yield ids[..., 0], tri_mat
+			
+	def positions(self, start=0, stop=None):
+		return self.co[start:stop]
+		
+	def triangle_positions(self, tris):
+		return self.co[tris]
+		
+	def corners(self, vertex_normals, chunk=CHUNK):
+		for ids, tri_mat in self.faces(chunk):
+			ids = ids.reshape(-1, 3)
+			corners = numpy.zeros((len(ids), 8))
+			corners[:, 0:3] = self.co[ids[:, 0]]
+			has_no = ids[:, 2] >= 0
+			corners[:, 3:6] = vertex_normals[ids[:, 0]] if vertex_normals is not None else 0
+			corners[has_no, 3:6] = self.no[ids[has_no, 2]]
+			has_uv = ids[:, 1] >= 0
+			corners[has_uv, 6:8] = self.uv[ids[has_uv, 1], :2]
+			yield corners.reshape(-1, 3, 8), tri_mat
+			
+	def __len__(self):
+		return len(self.co)
+		
+def open_mesh(file_path):
+	if file_path.lower().endswith(".obj"):
+		return ObjMesh(file_path)
+	return PlyMesh(file_path)
+	
+# streaming
+
+def vertex_normals(mesh, file_path, chunk=CHUNK):
+	
+	# Area weighted vertex normals, accumulated over the triangles a chunk at a time into a
+	# memory mapped file_path, so they need not fit in memory either.
+	
+	normals = numpy.memmap(file_path, numpy.float32, "w+", shape=(max(len(mesh), 1), 3))
+	for tris, tri_mat in mesh.triangles(chunk):
+		v = mesh.triangle_positions(tris)
+		face = numpy.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
+		used, inverse = numpy.unique(tris, return_inverse=True)
+		inverse = inverse.reshape(tris.shape)
+		for axis in range(3):
+			normals[used, axis] += sum(numpy.bincount(inverse[:, k], face[:, axis], len(used)) for k in range(3))
+	for start in range(0, len(mesh), chunk):
+		block = normals[start:start + chunk]
+		block /= numpy.maximum(numpy.linalg.norm(block, axis=1), 1e-12)[:, None]
+	return normals
+	
+def bounds(mesh, chunk=CHUNK):
+	lo = numpy.full(3, numpy.inf)
+	hi = numpy.full(3, -numpy.inf)
+	total = numpy.zeros(3)
+	for start in range(0, len(mesh), chunk):
+		co = mesh.positions(start, start + chunk)
+		lo = numpy.minimum(lo, co.min(axis=0))
+		hi = numpy.maximum(hi, co.max(axis=0))
+		total += co.sum(axis=0)
+	return lo, hi, total / max(len(mesh), 1)
+	
+def stream(mesh, file_path, name, by_number=False, number=(4, 4), size=(16, 16), number_mode="use_even_numbers", ndigits=None, collision_tolerance=None, workers=1, optimize=False, factors=(), chunk=CHUNK, log=print):
+	
+	# Sectionalizes mesh to the .sctx file_path, returning the number of sections, or None if a
+	# section exceeds the BDX vertex limit (nothing is written then). For each of factors, the
+	# sections are also merged into cells factor times the size, written to file_path with
+	# _xFACTOR appended to its name unless they exceed the limit.
+	
+	lo, hi, center = bounds(mesh, chunk)
+	log("bounds " + str(lo.tolist()) + " " + str(hi.tolist()))
+	numb, size = se.grid_layout(hi - lo, by_number, number, size, number_mode)
+	off = se.grid_offset(center, size)
+	grid = se.Grid(numb, size, (center[0] - off[0], center[1] - off[1]))
+	
+	with se.pool(workers) as pool, tempfile.TemporaryDirectory() as buckets:
+		
+		def bucket(cell, m):
+			return os.path.join(buckets, str(cell) + "_" + str(m) + ".f4")
+			
+		normals = None if mesh.normals else vertex_normals(mesh, os.path.join(buckets, "normals.f4"), chunk)
+		
+		counts = {}
+		for k, (corners, tri_mat) in enumerate(mesh.corners(normals, chunk)):
+			corners[..., 0] -= off[0]
+			corners[..., 1] -= off[1]
+			steps = se.sectionalize(corners, tri_mat, grid, workers, WELD_TOLERANCE, pool)
+			try:
+				while True:
+					next(steps)
+			except StopIteration as e:
+				results = e.value
+			for cell, m, verts in results:
+				verts[:, 7] = 1 - verts[:, 7]
+				with open(bucket(cell, m), "ab") as f:
+					f.write(verts.astype("<f4").tobytes())
+				counts[cell, m] = counts.get((cell, m), 0) + len(verts)
+			log("chunk " + str(k + 1) + ": " + str(len(corners)) + " triangles")
+		del normals
+		
+		cells = sorted(set(cell for cell, m in counts))
+		locations = grid.locations()
+		positions = [(locations[cell][0] + off[0], locations[cell][1] + off[1], 0.0) for cell in cells]
+		offset = sctx.offset(numb, size)
+		fine = se.cell_indices(positions, offset, size) if cells else numpy.zeros((0, 2), numpy.int64)
+		
+		written = None
+		for factor in [1] + sorted(factors):
+			parents, inverse, shift = se.coarsen(fine, factor, size)
+			children = [[] for parent in parents]
+			for k, cell in enumerate(cells):
+				children[inverse[k]].append((cell, shift[k]))
+				
+			most = max([sum(counts.get((cell, m), 0) for cell, s in c) for c in children for m in range(len(mesh.materials))] or [0])
+			if most > se.VERTICES_MAX:
+				log("WARNING: Meshes with more than 4095 vertices (1365 triangles) per material are not supported in BDX.\nAt least one section" + (" merged x" + str(factor) if factor > 1 else "") + " has " + str(most) + " vertices. Exporting aborted.")
+				if factor == 1:
+					return None
+				continue
+				
+			coarse_size = [s * factor for s in size]
+			coarse_offset = sctx.coarse_offset(offset, size, factor)
+			id_length = max(len(str(len(locations) if factor == 1 else len(parents))), 3)
+			names = [name + "_SECT." + str(i).zfill(id_length) for i in range(len(parents))]
+			links = se.neighbours(parents)
+			root, ext = os.path.splitext(file_path)
+			
+			misses = [0.0, 0.0]
+			with open(file_path if factor == 1 else root + "_x" + str(factor) + ext, "w") as f:
+				writer = sctx.Writer(f, ndigits)
+				for k, (x, y) in enumerate(parents.tolist()):
+					m_verts = OrderedDict()
+					for m, mat in enumerate(mesh.materials):
+						blocks = []
+						for cell, (dx, dy) in children[k]:
+							if (cell, m) in counts:
+								verts = numpy.fromfile(bucket(cell, m), "<f4").reshape(-1, 8)
+								verts[:, 0] += dx
+								verts[:, 1] += dy
+								blocks.append(verts)
+						if blocks:
+							m_verts[mat] = numpy.concatenate(blocks)
+							if optimize:
+								m_verts[mat], acmr_before, acmr_after = se.reorder_flat(m_verts[mat])
+								misses[0] += acmr_before * len(m_verts[mat]) / 3
+								misses[1] += acmr_after * len(m_verts[mat]) / 3
+					position = (coarse_offset[0] + x * coarse_size[0], coarse_offset[1] + y * coarse_size[1], 0.0)
+					neighbours = [names[l] if l is not None else None for l in links[k]]
+					writer.add(names[k], sctx.section(m_verts, position, (x, y), neighbours, coarse_size, collision_tolerance, None, optimize))
+				writer.close(coarse_offset, coarse_size + [0])
+			if optimize:
+				triangles = max(sum(counts.values()) // 3, 1)
+				log("ACMR " + str(round(misses[0] / triangles, 3)) + " -> " + str(round(misses[1] / triangles, 3)))
+			if factor == 1:
+				written = len(parents)
+	return written
+	
+def main(argv=None):
+	
+	parser = argparse.ArgumentParser(description="Sectionalizes a PLY or OBJ mesh into a .sctx file without Blender.")
+	parser.add_argument("mesh", help="binary or ascii PLY, or OBJ file")
+	parser.add_argument("sctx", help=".sctx file to write")
+	group = parser.add_mutually_exclusive_group()
+	group.add_argument("--size", type=float, nargs=2, default=(16, 16), metavar=("X", "Y"), help="section size")
+	group.add_argument("--number", type=int, nargs=2, metavar=("X", "Y"), help="number of sections")
+	parser.add_argument("--number-mode", choices=["use_automatic_numbering", "use_even_numbers", "use_odd_numbers"], default="use_even_numbers")
+	parser.add_argument("--ndigits", type=int, help="approximate to ndigits")
+	parser.add_argument("--collision", type=float, metavar="TOLERANCE", help="add collision data with this error tolerance")
+	parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+	parser.add_argument("--optimize", action="store_true", help="reorder triangles for the vertex cache")
+	parser.add_argument("--coarser", type=int, nargs="+", default=[], metavar="FACTOR", help="also write the sections merged into cells of these power of two multiples of the size")
+	args = parser.parse_args(argv)
+	
+	if any(f < 2 or f & (f - 1) for f in args.coarser):
+		parser.error("coarser factors must be powers of two")
+		
+	mesh = open_mesh(args.mesh)
+	name = os.path.splitext(os.path.basename(args.sctx))[0]
+	n = stream(mesh, args.sctx, name, args.number is not None, args.number, args.size, args.number_mode, args.ndigits, args.collision, args.workers, args.optimize, args.coarser)
+	if n is None:
+		return 1
+	print("written: " + args.sctx + " (" + str(n) + " sections)")
+	return 0
+	
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,8 @@
+import sys
+
+from test_import import stub_bpy
+
+# pytest imports the add-on's __init__.py, the repository root being a package, to collect the
+# tests under it, which needs bpy outside Blender
+
+sys.modules.setdefault("bpy", stub_bpy())
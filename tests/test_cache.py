@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+import unittest
+import numpy
+
+# Behavior of the evaluated mesh cache: least recently used entries are evicted first, from
+# memory and from disk, and evicted from memory they are still read back from disk.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT)
+
+import cache
+
+def arrays(value):
+	return {"co": numpy.full((100, 3), value, numpy.float32), "tris": numpy.arange(6, dtype=numpy.int32)}
+	
+NBYTES = sum(a.nbytes for a in arrays(0).values())
+
+class TestArrayCache(unittest.TestCase):
+	
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		
+	def tearDown(self):
+		self.directory.cleanup()
+		
+	def test_memory(self):
+		c = cache.ArrayCache(None, memory_bytes=2 * NBYTES)
+		c.put("a", arrays(1))
+		c.put("b", arrays(2))
+		self.assertEqual(c.get("a")["co"][0, 0], 1)
+		c.put("c", arrays(3))
+		self.assertIsNone(c.get("b"))
+		self.assertEqual(list(c.entries), ["a", "c"])
+		self.assertEqual(c.nbytes, 2 * NBYTES)
+		with self.assertRaises(ValueError):
+			c.get("a")["co"][0, 0] = 0
+			
+	def test_disk(self):
+		c = cache.ArrayCache(self.directory.name, memory_bytes=NBYTES)
+		c.put("a", arrays(1))
+		c.put("b", arrays(2))
+		self.assertEqual(list(c.entries), ["b"])
+		self.assertEqual(c.get("a")["co"][0, 0], 1)
+		self.assertEqual(cache.ArrayCache(self.directory.name).get("b")["co"][0, 0], 2)
+		self.assertIsNone(c.get("c"))
+		
+	def test_disk_eviction(self):
+		c = cache.ArrayCache(self.directory.name)
+		for k, key in enumerate("abc"):
+			c.put(key, arrays(k))
+			os.utime(c.path(key), (k, k))
+		c.disk_bytes = os.path.getsize(c.path("a")) * 2
+		cache.ArrayCache(self.directory.name).get("a")
+		c.put("d", arrays(3))
+		self.assertEqual(sorted(os.listdir(self.directory.name)), ["a.npz", "d.npz"])
+		
+	def test_corrupt(self):
+		c = cache.ArrayCache(self.directory.name)
+		with open(c.path("a"), "wb") as f:
+			f.write(b"not a zip file")
+		self.assertIsNone(c.get("a"))
+		
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+import types
+import unittest
+import importlib.util
+
+# Imports the add-on against a stub bpy: enabling it must stay cheap, importing none of the tool
+# modules (nor numpy, bmesh), and the operator stubs must have the signatures register_class
+# checks.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ARGS = {"invoke": 3, "modal": 3, "draw": 2, "execute": 2, "check": 2, "cancel": 2}
+
+def stub_bpy():
+	bpy = types.ModuleType("bpy")
+	prop = lambda *args, **kwargs: (args, kwargs)
+	bpy.props = types.SimpleNamespace(**{name: prop for name in ("BoolProperty", "IntProperty", "FloatProperty", "StringProperty", "EnumProperty", "IntVectorProperty", "FloatVectorProperty", "PointerProperty")})
+	bpy.types = types.SimpleNamespace(PropertyGroup=type("PropertyGroup", (), {}), Operator=type("Operator", (), {}), Scene=type("Scene", (), {}))
+	bpy.app = types.SimpleNamespace(handlers=types.SimpleNamespace(persistent=lambda f: f, load_post=[], scene_update_post=[]))
+	bpy.utils = types.SimpleNamespace(register_class=lambda c: None, unregister_class=lambda c: None)
+	return bpy
+	
+class TestImport(unittest.TestCase):
+	
+	def setUp(self):
+		self.modules = dict(sys.modules)
+		sys.modules["bpy"] = stub_bpy()
+		for name in ("numpy", "bmesh", "bdx_tools_test"):
+			sys.modules.pop(name, None)
+			
+	def tearDown(self):
+		sys.modules.clear()
+		sys.modules.update(self.modules)
+		
+	def load(self):
+		spec = importlib.util.spec_from_file_location("bdx_tools_test", os.path.join(ROOT, "__init__.py"), submodule_search_locations=[ROOT])
+		module = importlib.util.module_from_spec(spec)
+		sys.modules[spec.name] = module
+		start = time.perf_counter()
+		spec.loader.exec_module(module)
+		module.register()
+		return module, time.perf_counter() - start
+		
+	def test_lazy(self):
+		module, seconds = self.load()
+		print("\nadd-on import and register: " + str(round(seconds * 1000, 2)) + " ms")
+		for name in ("numpy", "bmesh", "bdx_tools_test.plane_sectionalizer", "bdx_tools_test.android_project_manager", "bdx_tools_test.java_package_synchronizer"):
+			self.assertNotIn(name, sys.modules)
+		self.assertLess(seconds, 0.5)
+		
+	def test_signatures(self):
+		module, seconds = self.load()
+		for c in module.classes:
+			for name, argcount in ARGS.items():
+				if hasattr(c, name):
+					self.assertEqual(getattr(c, name).__code__.co_argcount, argcount, c.__name__ + "." + name)
+					
+if __name__ == "__main__":
+	unittest.main()
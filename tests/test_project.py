@@ -0,0 +1,118 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Behavior of the Blender-free project utils on a minimal BDX project: the java package rule
+# (checked and fixed on the first line only) and the Android config read, edited and saved.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT)
+
+import project
+
+MANIFEST = """<?xml version="1.0" encoding="utf-8"?>
+<manifest xmlns:android="http://schemas.android.com/apk/res/android" package="com.game">
+	<application android:label="@string/app_name">
+		<activity
+			android:name="com.game.AndroidLauncher"
+			android:screenOrientation="landscape"
+			android:configChanges="keyboard|keyboardHidden|orientation|screenSize">
+		</activity>
+	</application>
+</manifest>
+"""
+
+LAUNCHER = """package com.game;
+
+import android.os.Bundle;
+import com.badlogic.gdx.backends.android.AndroidApplication;
+import com.badlogic.gdx.backends.android.AndroidApplicationConfiguration;
+
+public class AndroidLauncher extends AndroidApplication {
+	@Override
+	protected void onCreate (Bundle savedInstanceState) {
+		super.onCreate(savedInstanceState);
+		AndroidApplicationConfiguration config = new AndroidApplicationConfiguration();
+		config.resolutionStrategy = new com.badlogic.gdx.backends.android.surfaceview.FillResolutionStrategy();
+		config.useAccelerometer = false;
+		initialize(new BdxApp(), config);
+	}
+}
+"""
+
+SOURCES = {
+	"BdxApp.java": "package com.game;\n\npublic class BdxApp {}\n",
+	"Ok.java": "package com.game;\n",
+	"Moved.java": "package com.other;\n\nclass Moved {}\n",
+	"NoPackage.java": "class NoPackage {}\n",
+	os.path.join("inst", "Player.java"): "package com.game;\r\n\r\nclass Player {}\r\n",
+	os.path.join("inst", "Enemy.java"): "package com.game.inst;\n"
+}
+
+def write(file_path, text):
+	os.makedirs(os.path.dirname(file_path), exist_ok=True)
+	with open(file_path, "w", newline="") as f:
+		f.write(text)
+		
+def read(file_path):
+	with open(file_path, newline="") as f:
+		return f.read()
+		
+class TestProject(unittest.TestCase):
+	
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.root = self.directory.name
+		self.src = os.path.join(self.root, "core", "src", "com", "game")
+		for name, text in SOURCES.items():
+			write(os.path.join(self.src, name), text)
+		write(os.path.join(self.root, "android", "src", "com", "game", "AndroidLauncher.java"), LAUNCHER)
+		write(os.path.join(self.root, "android", "AndroidManifest.xml"), MANIFEST)
+		
+	def tearDown(self):
+		self.directory.cleanup()
+		
+	def test_java_package(self):
+		self.assertEqual(project.java_package("com.game"), "com.game")
+		self.assertEqual(project.java_package("com.game", os.path.join("inst", "boss")), "com.game.inst.boss")
+		self.assertIsNone(project.java_package_fixed(["package com.game;\r\n", "class A {}\n"], "com.game"))
+		self.assertEqual(project.java_package_fixed(["package com.other;\n", "class A {}\n"], "com.game"), ["package com.game;\n", "class A {}\n"])
+		self.assertEqual(project.java_package_fixed(["class A {}\n"], "com.game"), ["package com.game;\n", "class A {}\n"])
+		self.assertEqual(project.java_package_fixed([], "com.game"), ["package com.game;\n"])
+		
+	def test_java_sync(self):
+		wrong = sorted(os.path.join(self.src, name) for name in ("Moved.java", "NoPackage.java", os.path.join("inst", "Player.java")))
+		self.assertEqual(sorted(project.java_pack_errors(self.root)), wrong)
+		self.assertEqual(sorted(project.java_pack_sync(self.root)), wrong)
+		self.assertEqual(project.java_pack_errors(self.root), [])
+		self.assertEqual(read(os.path.join(self.src, "Moved.java")), "package com.game;\n\nclass Moved {}\n")
+		self.assertEqual(read(os.path.join(self.src, "NoPackage.java")), "package com.game;\nclass NoPackage {}\n")
+		self.assertTrue(read(os.path.join(self.src, "inst", "Player.java")).startswith("package com.game.inst;\n"))
+		self.assertEqual(read(os.path.join(self.src, "Ok.java")), SOURCES["Ok.java"])
+		
+	def test_android_config(self):
+		config = project.AndroidConfig.from_project(self.root)
+		self.assertEqual([getattr(config, s) for s in config.settings], ["landscape", "FillResolutionStrategy()", False, False, False, True])
+		self.assertEqual(config.save(), [])
+		
+		config.screen_orientation = "portrait"
+		config.resolution_strategy = "RatioResolutionStrategy(width, height)"
+		config.use_vibrator = True
+		config.use_accelerometer = True
+		config.use_gyroscope = True
+		config.use_compass = False
+		self.assertEqual(sorted(config.save()), sorted([config.launcher, config.manifest]))
+		self.assertEqual(config.save(), [])
+		
+		config = project.AndroidConfig.from_project(self.root)
+		self.assertEqual([getattr(config, s) for s in config.settings], ["portrait", "RatioResolutionStrategy(width, height)", True, True, True, False])
+		self.assertLess(read(config.manifest).index("</application>"), read(config.manifest).index("android.permission.VIBRATE"))
+		
+		config.use_vibrator = False
+		config.save()
+		self.assertEqual(read(config.manifest), MANIFEST.replace("landscape", "portrait"))
+		
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,83 @@
+import os
+import sys
+import json
+import math
+import tempfile
+import unittest
+import numpy
+from collections import OrderedDict
+
+# Behavior of the .sctx encoder, writer and reader: fixed precision floats parse as the json of
+# the rounded floats, and written sections read back whole, whatever their names hold.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT)
+
+import sctx
+
+FLOATS = [0.0, -0.0, 0.5, 1.5, 2.5, -2.5, 0.125, 2.675, 1.005, -0.0001, 1e-9, 0.1, 123456.789, -98765.4321, 1e15, 3e300, 4503599627370497.0]
+
+def rounded(a, ndigits):
+	return [repr(f) for f in json.loads(json.dumps([round(f, ndigits) for f in numpy.asarray(a, numpy.float64).tolist()]))]
+	
+def parsed(s):
+	return [repr(f) for f in json.loads(s)]
+	
+class TestEncode(unittest.TestCase):
+	
+	def test_rounding(self):
+		state = numpy.random.RandomState(5)
+		values = numpy.concatenate((FLOATS, state.randn(5000) * 1000, state.randint(-10 ** 6, 10 ** 6, 5000) / 2000.0))
+		for a in (values, values[numpy.abs(values) < 1e30].astype(numpy.float32)):
+			for ndigits in range(0, 8):
+				self.assertEqual(parsed(sctx.encode_floats(a, ndigits)), rounded(a, ndigits), ndigits)
+				
+	def test_non_finite(self):
+		a = numpy.array([1.25, float("nan"), float("inf"), -float("inf"), -1.25])
+		for ndigits in (None, 1, 3):
+			s = sctx.encode_floats(a, ndigits)
+			self.assertEqual(s.count("NaN"), 1)
+			self.assertEqual(s.count("-Infinity"), 1)
+			self.assertTrue(math.isnan(json.loads(s)[1]))
+			
+	def test_exact(self):
+		a = numpy.concatenate((FLOATS, numpy.random.RandomState(6).randn(3 * sctx.CHUNK)))
+		self.assertEqual(json.loads(sctx.encode_floats(a)), a.tolist())
+		self.assertEqual(sctx.encode_floats(numpy.arange(5)), "[0,1,2,3,4]")
+		self.assertEqual(sctx.encode_floats(numpy.zeros(0), 3), "[]")
+		
+class TestRoundTrip(unittest.TestCase):
+	
+	def test_writer(self):
+		names = ["Plane_SECT.000", "]{", "a\"b]{\"c", "[}:,"]
+		state = numpy.random.RandomState(7)
+		sections = OrderedDict()
+		for k, name in enumerate(names):
+			m_verts = OrderedDict((m, state.rand(3 * (k + 1), 8).astype(numpy.float32)) for m in ("Material", "]{\""))
+			sections[name] = sctx.section(m_verts, (k * 16.0, -8.0, 0.0), (k, 0), [None] * 8, (16, 16))
+			
+		with tempfile.TemporaryDirectory() as directory:
+			file_path = os.path.join(directory, "Plane.sctx")
+			with open(file_path, "w") as f:
+				writer = sctx.Writer(f)
+				for name, section in sections.items():
+					writer.add(name, section)
+				writer.close([8.0, 0.0, 0.0], [16, 16, 0])
+			with open(file_path) as f:
+				self.assertEqual(list(json.load(f)["objects"]), names)
+				
+			with sctx.Sctx(file_path) as s:
+				self.assertEqual(list(s), names)
+				self.assertEqual(s.offset, [8.0, 0.0, 0.0])
+				self.assertEqual(s.size, [16, 16, 0])
+				for name, section in sections.items():
+					self.assertEqual(s[name].position, section["position"])
+					self.assertEqual(s[name].data["cell"], section["cell"])
+					self.assertEqual(list(s[name].model), list(section["model"]))
+					for m, verts in section["model"].items():
+						self.assertTrue(numpy.array_equal(s[name].model[m], verts))
+				self.assertEqual(sctx.verify(s), [])
+				
+if __name__ == "__main__":
+	unittest.main()
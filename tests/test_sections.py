@@ -0,0 +1,177 @@
+import os
+import sys
+import unittest
+import numpy
+
+# Behavior of the Blender-free geometry kernels: welding, clipping to the grid (area and open
+# boundary kept, results independent of the number of workers), vertex cache reordering,
+# coarser grids and collision data within tolerance.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT)
+
+import sections as se
+import sctx
+
+def plane(k, lo, hi, seed=1):
+	
+	# A k by k vertex grid over [lo, hi] squared, with random heights, as (co, tris).
+	
+	x, y = numpy.meshgrid(numpy.linspace(lo, hi, k), numpy.linspace(lo, hi, k))
+	co = numpy.column_stack((x.ravel(), y.ravel(), numpy.random.RandomState(seed).rand(k * k)))
+	idx = numpy.arange(k * k).reshape(k, k)
+	a, b, c, d = idx[:-1, :-1].ravel(), idx[:-1, 1:].ravel(), idx[1:, 1:].ravel(), idx[1:, :-1].ravel()
+	return co, numpy.concatenate((numpy.column_stack((a, b, c)), numpy.column_stack((a, c, d))))
+	
+def corners(co, tris):
+	normals = numpy.zeros(tris.shape + (3,))
+	normals[..., 2] = 1
+	return numpy.concatenate((co[tris], normals, co[tris][..., :2] / 100), axis=2)
+	
+def fan_area(polys, counts):
+	co = se.fan(polys, counts)[0].reshape(-1, 3)
+	return sctx.area(co, numpy.arange(len(co)).reshape(-1, 3))
+	
+def run(steps):
+	try:
+		while True:
+			next(steps)
+	except StopIteration as e:
+		return e.value
+		
+def world(results, grid):
+	
+	# Triangle corner positions of sectionalize results, back in world space.
+	
+	locations = grid.locations()
+	blocks = []
+	for cell, m, verts in results:
+		co = verts[:, :3].astype(numpy.float64)
+		co[:, 0] += locations[cell][0]
+		co[:, 1] += locations[cell][1]
+		blocks.append(co)
+	co = numpy.concatenate(blocks)
+	return co, numpy.arange(len(co)).reshape(-1, 3)
+	
+class TestWeld(unittest.TestCase):
+	
+	def test_weld(self):
+		co = numpy.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1e-5, 0, 0], [1, 1e-5, 0], [5, 5, 5]], float)
+		tris = numpy.array([[0, 1, 2], [3, 4, 5], [0, 3, 2]])
+		welded, welded_tris, keep = se.weld(co, tris, 0.0001)
+		self.assertEqual(len(welded), 4)
+		self.assertEqual(keep.tolist(), [True, True, False])
+		self.assertEqual(welded_tris[1][:2].tolist(), welded_tris[0][:2].tolist())
+		
+class TestClip(unittest.TestCase):
+	
+	def test_clip_polygons(self):
+		polys = numpy.array([[[0, 0, 0], [4, 0, 0], [0, 4, 0]], [[-3, 0, 0], [-1, 0, 0], [-1, 2, 0]], [[2, 0, 0], [3, 0, 0], [3, 1, 0]]], float)
+		counts = numpy.full(3, 3)
+		left, left_counts = se.clip_polygons(polys, counts, 0, 1.0, 1)
+		right, right_counts = se.clip_polygons(polys, counts, 0, 1.0, -1)
+		self.assertEqual(left_counts.tolist(), [4, 3, 0])
+		self.assertEqual(right_counts.tolist(), [3, 0, 3])
+		self.assertAlmostEqual(fan_area(left, left_counts) + fan_area(right, right_counts), 8 + 2 + 0.5)
+		
+class TestSectionalize(unittest.TestCase):
+	
+	@classmethod
+	def setUpClass(cls):
+		cls.co, cls.tris = plane(40, -30, 30)
+		cls.corners = corners(cls.co, cls.tris)
+		cls.tri_mat = numpy.arange(len(cls.tris)) % 2
+		numb, size = se.grid_layout((60, 60), True, (5, 4), None, None)
+		cls.grid = se.Grid(numb, size, (0.3, 0.2))
+		cls.results = run(se.sectionalize(cls.corners, cls.tri_mat, cls.grid))
+		
+	def test_area(self):
+		self.assertAlmostEqual(sctx.area(*world(self.results, self.grid)), sctx.area(self.co, self.tris), 3)
+		
+	def test_open_boundary(self):
+		self.assertAlmostEqual(sctx.boundary_length(*world(self.results, self.grid), 0.001), sctx.boundary_length(self.co, self.tris, 0.001), 3)
+		
+	def test_cells(self):
+		half = numpy.array(self.grid.size) * 0.5
+		for cell, m, verts in self.results:
+			self.assertLessEqual(len(verts), se.VERTICES_MAX)
+			self.assertTrue((numpy.abs(verts[:, :2]) <= half + 0.0001).all())
+			
+	def test_workers(self):
+		with se.pool(2) as pool:
+			for results in (run(se.sectionalize(self.corners, self.tri_mat, self.grid, 3)), run(se.sectionalize(self.corners, self.tri_mat, self.grid, 2, pool=pool))):
+				self.assertEqual([(c, m) for c, m, v in results], [(c, m) for c, m, v in self.results])
+				for (c, m, verts), (c1, m1, verts1) in zip(results, self.results):
+					self.assertTrue(numpy.array_equal(verts, verts1))
+					
+class TestVertexCache(unittest.TestCase):
+	
+	def test_tipsify(self):
+		co, tris = plane(30, 0, 1)
+		tris = tris[numpy.random.RandomState(2).permutation(len(tris))]
+		order = se.tipsify(tris)
+		self.assertEqual(sorted(order.tolist()), list(range(len(tris))))
+		self.assertLess(se.acmr(tris[order]), se.acmr(tris))
+		
+	def test_reorder_indexed(self):
+		co, tris = plane(30, 0, 1)
+		for tris in (tris, tris[numpy.random.RandomState(3).permutation(len(tris))]):
+			positions, indices = se.reorder_indexed(co, tris)
+			self.assertLessEqual(se.acmr(indices), se.acmr(tris))
+			self.assertTrue(numpy.array_equal(numpy.sort(numpy.sort(positions[indices], axis=1), axis=0), numpy.sort(numpy.sort(co[tris], axis=1), axis=0)))
+			
+	def test_reorder_flat(self):
+		co, tris = plane(20, 0, 1)
+		verts = numpy.zeros((3 * len(tris), 8), numpy.float32)
+		verts[:, :3] = co[tris].reshape(-1, 3)
+		for verts in (verts, verts.reshape(-1, 3, 8)[numpy.random.RandomState(4).permutation(len(tris))].reshape(-1, 8)):
+			reordered, before, after = se.reorder_flat(verts)
+			self.assertLessEqual(after, before)
+			self.assertEqual(before, se.acmr(se.unique_rows(verts.view(numpy.int32))[1].reshape(-1, 3)))
+			
+class TestCoarsen(unittest.TestCase):
+	
+	def test_coarsen(self):
+		size = (10.0, 5.0)
+		cells = numpy.array([[-2, -1], [-1, -1], [0, 0], [1, 0], [3, 1], [0, -1]])
+		for factor in (2, 4):
+			parents, inverse, shift = se.coarsen(cells, factor, size)
+			self.assertEqual(len(set(map(tuple, parents.tolist()))), len(parents))
+			self.assertEqual(inverse[0], 0)
+			centers = (parents[inverse] * factor + (factor - 1) * 0.5) * size
+			self.assertTrue(numpy.allclose(centers + shift, cells * size))
+			self.assertTrue((numpy.abs(shift) < numpy.array(size) * factor * 0.5).all())
+			
+class TestCollision(unittest.TestCase):
+	
+	size = (16.0, 16.0)
+	
+	def hills(self, k):
+		x, y = numpy.meshgrid(numpy.linspace(-8, 8, k), numpy.linspace(-8, 8, k))
+		co = numpy.column_stack((x.ravel(), y.ravel(), 2 * numpy.sin(x.ravel() * 0.5) * numpy.cos(y.ravel() * 0.3)))
+		idx = numpy.arange(k * k).reshape(k, k)
+		a, b, c, d = idx[:-1, :-1].ravel(), idx[:-1, 1:].ravel(), idx[1:, 1:].ravel(), idx[1:, :-1].ravel()
+		return co[numpy.concatenate((numpy.column_stack((a, b, c)), numpy.column_stack((a, c, d))))].reshape(-1, 3)
+		
+	def test_heightfield(self):
+		co = self.hills(41)
+		for tolerance in (0.5, 0.1, 0.05):
+			heights, positions, indices = se.collision(co, self.size, tolerance)
+			self.assertLess(heights.size, len(se.unique_rows(co)[0]))
+			self.assertLessEqual(numpy.abs(se.bilinear(heights, self.size, co[:, :2]) - co[:, 2]).max(), tolerance)
+		self.assertIsNone(se.collision(co, self.size, 0.02)[0])
+		
+	def test_mesh(self):
+		co = self.hills(41)
+		overhang = co.reshape(-1, 3, 3)[:, ::-1].reshape(-1, 3) + (0, 0, 3)
+		co = numpy.concatenate((co, overhang))
+		for tolerance in (2.0, 1.0):
+			heights, positions, indices = se.collision(co, self.size, tolerance)
+			self.assertIsNone(heights)
+			self.assertLess(len(positions), len(se.unique_rows(co)[0]))
+			nearest = numpy.sqrt(((co[:, None, :] - positions[None, :, :]) ** 2).sum(axis=2)).min(axis=1)
+			self.assertLessEqual(nearest.max(), tolerance)
+			
+if __name__ == "__main__":
+	unittest.main()
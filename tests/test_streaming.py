@@ -0,0 +1,101 @@
+import os
+import sys
+import tempfile
+import unittest
+import numpy
+
+# Behavior of streaming.py on small binary and ascii PLY and OBJ files: the sections written
+# keep the area and open boundary of the mesh, whatever the chunk size and number of workers.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT)
+
+import streaming
+import sctx
+
+HEADER = "ply\nformat {} 1.0\ncomment test\nelement vertex {}\nproperty float x\nproperty float y\nproperty float z\nproperty float s\nproperty float t\nelement face {}\nproperty list uchar int vertex_indices\nend_header\n"
+
+def grid(k):
+	
+	# A k by k vertex grid of quads over [-15, 25] x [-10, 30] with random heights, as float32
+	# positions and quads.
+	
+	x, y = numpy.meshgrid(numpy.linspace(-15, 25, k), numpy.linspace(-10, 30, k))
+	co = numpy.column_stack((x.ravel(), y.ravel(), numpy.random.RandomState(8).rand(k * k))).astype(numpy.float32)
+	idx = numpy.arange(k * k).reshape(k, k)
+	return co, numpy.column_stack((idx[:-1, :-1].ravel(), idx[:-1, 1:].ravel(), idx[1:, 1:].ravel(), idx[1:, :-1].ravel()))
+	
+def write_ply(file_path, co, quads, fmt):
+	vertices = numpy.zeros(len(co), [("x", "<f4"), ("y", "<f4"), ("z", "<f4"), ("s", "<f4"), ("t", "<f4")])
+	vertices["x"], vertices["y"], vertices["z"] = co.T
+	vertices["s"], vertices["t"] = co[:, 0] / 40, co[:, 1] / 40
+	with open(file_path, "wb") as f:
+		f.write(HEADER.format(fmt, len(co), len(quads)).encode("ascii"))
+		if fmt == "ascii":
+			for v in vertices.tolist():
+				f.write((" ".join(map(repr, v)) + "\n").encode("ascii"))
+			for q in quads.tolist():
+				f.write(("4 " + " ".join(map(str, q)) + "\n").encode("ascii"))
+		else:
+			faces = numpy.zeros(len(quads), [("n", "u1"), ("i", "<i4", (4,))])
+			faces["n"] = 4
+			faces["i"] = quads
+			f.write(vertices.tobytes())
+			f.write(faces.tobytes())
+			
+def write_obj(file_path, co, quads):
+	with open(file_path, "w") as f:
+		for v in co.tolist():
+			f.write("v " + " ".join(map(repr, v)) + "\n")
+		for v in co.tolist():
+			f.write("vt " + repr(v[0] / 40) + " " + repr(v[1] / 40) + "\n")
+		for k, q in enumerate(quads.tolist()):
+			if k % (len(quads) // 2) == 0:
+				f.write("usemtl " + ("Grass" if k else "Rock") + "\n")
+			f.write("f " + " ".join(str(i + 1) + "/" + str(i + 1) for i in q) + "\n")
+			
+class TestStream(unittest.TestCase):
+	
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.co, self.quads = grid(30)
+		self.tris = numpy.concatenate((self.quads[:, [0, 1, 2]], self.quads[:, [0, 2, 3]]))
+		
+	def tearDown(self):
+		self.directory.cleanup()
+		
+	def path(self, name):
+		return os.path.join(self.directory.name, name)
+		
+	def stream(self, name, **kwargs):
+		n = streaming.stream(streaming.open_mesh(self.path(name)), self.path(name + ".sctx"), "Terrain", size=(10, 10), chunk=500, log=lambda s: None, **kwargs)
+		with sctx.Sctx(self.path(name + ".sctx")) as s:
+			self.assertEqual(n, len(s))
+			self.assertEqual(sctx.verify(s, (self.co.astype(numpy.float64), self.tris)), [])
+			materials = set(m for section in s.values() for m in section.model)
+		with open(self.path(name + ".sctx"), "rb") as f:
+			return f.read(), materials
+			
+	def test_binary_ply(self):
+		write_ply(self.path("m.ply"), self.co, self.quads, "binary_little_endian")
+		data, materials = self.stream("m.ply")
+		self.assertEqual(materials, {sctx.DEFAULT_MATERIAL})
+		self.assertEqual(self.stream("m.ply", workers=3)[0], data)
+		
+	def test_ascii_ply(self):
+		write_ply(self.path("m.ply"), self.co, self.quads, "ascii")
+		self.stream("m.ply", ndigits=5, collision_tolerance=0.5)
+		
+	def test_obj(self):
+		write_obj(self.path("m.obj"), self.co, self.quads)
+		data, materials = self.stream("m.obj", optimize=True)
+		self.assertEqual(materials, {"Rock", "Grass"})
+		
+	def test_vertex_limit(self):
+		write_ply(self.path("m.ply"), *grid(60), fmt="binary_little_endian")
+		self.assertIsNone(streaming.stream(streaming.open_mesh(self.path("m.ply")), self.path("big.sctx"), "Terrain", size=(40, 40), log=lambda s: None))
+		self.assertFalse(os.path.exists(self.path("big.sctx")))
+		
+if __name__ == "__main__":
+	unittest.main()
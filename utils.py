@@ -2,6 +2,7 @@ import bpy
 import os
 import time
 from mathutils import Vector
+from . import project as pj
 
 # path utils
 
@@ -12,18 +13,16 @@ def project_root():
 	return p.abspath(j(bpy.path.abspath('//'), p.pardir))
 	
 def assets_root():
-	return p.join(project_root(), "android", "assets", "bdx")
+	return pj.assets_root(project_root())
 	
 def src_root(project="core", target_file="BdxApp.java"):
-	for root, dirs, files in os.walk(j(project_root(), project, "src")):
-		if target_file in files:
-			return root
-			
+	return pj.src_root(project_root(), project, target_file)
+	
 def android_launcher(target_file="AndroidLauncher.java"):
-	return j(src_root("android", target_file), target_file)
+	return pj.android_launcher(project_root(), target_file)
 	
 def android_manifest(target_file="AndroidManifest.xml"):
-	return j(project_root(), "android", target_file)
+	return pj.android_manifest(project_root(), target_file)
 	
 # string utils
 
@@ -35,51 +34,43 @@ def id(n, prefix=".", length=4):
 	s += d
 	return s
 	
-# text utils
-
-def lines(file_path):
-	with open(file_path, 'r') as f:
-		return f.readlines()
-	return
-	
-def enum_line_containing(lines, pattern):
-	for index, line in enumerate(lines):
-		if pattern in line:
-			return [index, line]
-	return
-	
-def replace_line(index, lines, new_line):
-	lines[index] = new_line + "\n";
-	
-def insert_line(index, lines, new_line):
-	lines.insert(index, new_line + "\n")
-	lines = "".join(lines)
-	
-def write_lines(lines, file_path):
-	with open(file_path, 'w') as f:
-		f.writelines(lines)
-		
 # java utils
 
 def java_texts():
 	return [t for t in bpy.data.texts.values() if t.name.endswith(".java")]
 	
 def java_pack_name():
-	with open(j(src_root(), "BdxApp.java"), 'r') as f:
-		_, package = f.readline().split()
-	return package[:-1]
+	return pj.java_pack_name(project_root())
+	
+def java_text_package():
+	return pj.java_package(java_pack_name())
+	
+def java_text_error(t, package):
+	return pj.java_package_fixed([t.lines[0].body], package) is not None
 	
+def java_text_sync(t, package):
+	
+	# Only the first line is edited, keeping the cursor and undo history of the text, unless
+	# the package line is missing and must be inserted.
+	
+	l = pj.java_package_fixed([t.lines[0].body], package)
+	if l is None:
+		return
+	if len(l) == 1:
+		t.lines[0].body = l[0].rstrip("\n")
+	else:
+		index = t.current_line_index
+		t.from_string(l[0] + t.as_string())
+		t.current_line_index = index + 1
+		
 def java_pack_error():
-	pack_name = java_pack_name();
-	for t in java_texts():
-		if t.lines[0].body != "package " + pack_name + ";":
-			return True
-	return False
+	package = java_text_package()
+	return any(java_text_error(t, package) for t in java_texts())
 	
 def java_pack_sync():
-	pack_name = java_pack_name();
+	package = java_text_package()
 	for t in java_texts():
-		t.lines[0].body = "package " + pack_name + ";"
+		java_text_sync(t, package)
 		
 # profiling utils
 
@@ -124,4 +115,4 @@ def point_inside_rectangle(pnt, rect):
 	cen, dim = rect
 	crn = Vector((cen.x - dim.x * 0.5, cen.y - dim.y * 0.5))
 	return (crn.x <= pnt.x <= crn.x + dim.x and crn.y <= pnt.y <= crn.y + dim.y)
-	
+	
\ No newline at end of file